@@ -1,6 +1,9 @@
 import streamlit as st
 from datetime import datetime
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 import traceback
 from database.connection import db_manager
@@ -27,8 +30,26 @@ st.set_page_config(
     }
 )
 
-# Configure detailed logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging: WARNING by default (override with LOG_LEVEL), and route
+# records through a queue so handler I/O happens off the script thread
+@st.cache_resource
+def _setup_logging():
+    """Start the queue log listener exactly once per process.
+
+    Streamlit re-executes this script on every rerun; without the
+    guard each interaction would start (and leak) another listener
+    thread.
+    """
+    log_queue = queue.Queue(-1)
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "WARNING"),
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    return listener
+
+_setup_logging()
 logger = logging.getLogger(__name__)
 
 # Hide the default Streamlit menu and footer
@@ -53,10 +74,20 @@ footer {visibility: hidden;}
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 # Initialize services
+@st.cache_resource
+def get_services():
+    """Build service singletons shared across all sessions in the process"""
+    return AIService(), UserService(), PlanService()
+
+@st.cache_resource
+def get_db():
+    """Initialize database tables exactly once per process"""
+    db_manager.init_db()
+    logger.info("Database initialized successfully")
+    return db_manager
+
 try:
-    ai_service = AIService()
-    user_service = UserService()
-    plan_service = PlanService()
+    ai_service, user_service, plan_service = get_services()
     logger.info("Services initialized successfully")
 except Exception as e:
     logger.error(f"Error initializing services: {str(e)}")
@@ -72,19 +103,56 @@ if 'shown_popups' not in st.session_state:
 
 # Initialize database
 try:
-    if 'db_initialized' not in st.session_state:
-        db_manager.init_db()
-        st.session_state.db_initialized = True
-        logger.info("Database initialized successfully")
+    get_db()
 except Exception as e:
     logger.error(f"Database initialization error: {str(e)}")
     st.error(f"Database initialization error: {str(e)}")
 
+# Navigation entries are static; build once at import instead of per rerun
+NAV_ITEMS = {
+    'home': ('🏠 Home', display_home_page),
+    'profile': ('👤 Profile', display_profile_page),
+    'journal': ('📓 Journal', display_journal_page),
+    'progress': ('📊 Progress', display_progress_page),
+    'history': ('📚 History', display_history_page)
+}
+
+@st.fragment
+def render_nav():
+    """Navigation button row
+
+    Runs as a fragment so a click re-executes only this block; a full
+    script rerun is requested explicitly only when the page actually
+    changes.
+    """
+    cols = st.columns(5)
+    for i, (nav_key, (label, func)) in enumerate(NAV_ITEMS.items()):
+        if cols[i].button(label, key=f"nav_{nav_key}", use_container_width=True):
+            if st.session_state.nav != nav_key:
+                st.session_state.nav = nav_key
+                st.rerun(scope="app")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_users():
+    """Cache the user list so every widget interaction doesn't re-query SQLite"""
+    return user_service.get_all_users()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_profile(name):
+    """Cache profile lookups used by the per-rerun navigation check"""
+    return user_service.get_user_profile(name)
+
+@st.fragment
 def handle_user_selection():
-    """Handle user selection and creation with proper form fields"""
+    """Handle user selection and creation with proper form fields
+
+    Fragment-scoped: typing in the new-user form no longer reruns the
+    whole script; the explicit st.rerun() calls below still trigger a
+    full pass when the active user changes.
+    """
     try:
         # Get all existing users
-        users = user_service.get_all_users()
+        users = _cached_users()
         user_names = [user for user in users]
         
         col1, col2 = st.columns([3, 1])
@@ -108,6 +176,7 @@ def handle_user_selection():
                     if new_name not in user_names:
                         success = user_service.create_user(new_name)
                         if success:
+                            _cached_users.clear()
                             st.session_state.current_user = new_name
                             st.session_state.nav = 'profile'  # Always go to profile for new users
                             st.success(f"Created new user: {new_name}")
@@ -151,12 +220,16 @@ def main():
             st.title("🏋️ AI Personal Trainer")
             st.header("👤 User Management")
             
-            # Debug info - helpful for troubleshooting
-            with st.expander("Debug Info", expanded=False):
-                st.write(f"Current user: {st.session_state.current_user}")
-                st.write(f"Current page: {st.session_state.nav}")
-                st.write(f"Python version: {sys.version}")
-                
+            # Debug info - helpful for troubleshooting, skipped entirely
+            # in normal use so reruns don't pay for the extra widgets
+            st.toggle("Debug mode", key="debug_mode")
+            if st.session_state.get("debug_mode"):
+                with st.expander("Debug Info", expanded=False):
+                    st.write(f"Current user: {st.session_state.current_user}")
+                    st.write(f"Current page: {st.session_state.nav}")
+                    st.write(f"Python version: {sys.version}")
+
+
             # Handle user selection
             handle_user_selection()
             
@@ -179,31 +252,18 @@ def main():
                 
             # Navigation buttons
             st.markdown('<div style="margin-bottom: 20px;">', unsafe_allow_html=True)
-            cols = st.columns(5)
-            
-            nav_items = {
-                'home': ('🏠 Home', display_home_page),
-                'profile': ('👤 Profile', display_profile_page),
-                'journal': ('📓 Journal', display_journal_page),
-                'progress': ('📊 Progress', display_progress_page),
-                'history': ('📚 History', display_history_page)
-            }
-            
-            for i, (nav_key, (label, func)) in enumerate(nav_items.items()):
-                if cols[i].button(label, key=f"nav_{nav_key}", use_container_width=True):
-                    st.session_state.nav = nav_key
-                    st.rerun()
-            
+            render_nav()
+
             st.markdown('</div>', unsafe_allow_html=True)
-            
+
             # Display current page with error handling
             try:
-                current_page = nav_items[st.session_state.nav][1]
+                current_page = NAV_ITEMS[st.session_state.nav][1]
                 
                 # Check for empty profile and redirect if needed
                 if current_page != display_profile_page:
                     try:
-                        profile = user_service.get_user_profile(st.session_state.current_user)
+                        profile = _cached_profile(st.session_state.current_user)
                         if not profile or not profile.get('goal') or not profile.get('gender'):
                             st.warning("Please complete your profile before accessing other pages.")
                             current_page = display_profile_page
@@ -214,21 +274,22 @@ def main():
                 
                 # Display the appropriate page
                 if current_page == display_home_page:
-                    current_page(st.session_state.current_user, plan_service, ai_service)
+                    current_page(st.session_state.current_user, plan_service, ai_service, user_service)
                 elif current_page == display_profile_page:
                     current_page(st.session_state.current_user, user_service)
                 elif current_page == display_journal_page:
-                    current_page(st.session_state.current_user, plan_service)
+                    current_page(st.session_state.current_user, plan_service, user_service)
                 elif current_page == display_progress_page:
                     current_page(st.session_state.current_user)
                 elif current_page == display_history_page:
                     current_page(st.session_state.current_user, plan_service)
                 
             except Exception as e:
-                logger.error(f"Error displaying page {st.session_state.nav}: {str(e)}")
+                logger.error(f"Error displaying page {st.session_state.nav}: {str(e)}", exc_info=True)
                 st.error(f"Error displaying page: {str(e)}")
-                st.code(traceback.format_exc())
-                
+                if st.session_state.get("debug_mode"):
+                    st.code(traceback.format_exc())
+
                 # Show a simplified view if there's an error
                 st.warning("Showing simplified profile view due to errors.")
                 
@@ -257,15 +318,17 @@ def main():
                                 'fav_foods': ''
                             }
                             user_service.save_profile(basic_profile)
+                            _cached_profile.clear()
                             st.success("Basic profile saved!")
                             st.rerun()
                         except Exception as inner_e:
                             st.error(f"Could not save basic profile: {str(inner_e)}")
 
     except Exception as e:
-        logger.error(f"Application error: {str(e)}")
+        logger.error(f"Application error: {str(e)}", exc_info=True)
         st.error(f"An unexpected error occurred: {str(e)}")
-        st.code(traceback.format_exc())
+        if st.session_state.get("debug_mode"):
+            st.code(traceback.format_exc())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
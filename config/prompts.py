@@ -3,6 +3,10 @@ Prompt templates for AI services in PTApp.
 Each template can be formatted with user-specific data before sending to the AI.
 '''
 
+import re
+import string
+from types import MappingProxyType
+
 # === System Role Prompts ===
 SYSTEM_PROMPT_TRAINER = (
     "You are a certified personal trainer and nutritionist. "
@@ -98,23 +102,13 @@ Prompt the user for a weekly journal entry. Ask about:
 - Goals for next week
 '''
 
-FIRST_PLAN_PROMPT = '''
+# The static format/safety spec lives in the *system* message so OpenAI's
+# automatic prompt caching can hit on the unchanging prefix; only the short
+# per-user profile block is sent as the user message.
+FIRST_PLAN_SYSTEM = '''
 You are a certified personal trainer and nutritionist. Create a COMPLETE and DETAILED fitness plan.
 DO NOT USE ANY PLACEHOLDER TEXT OR [REPEAT FORMAT] STATEMENTS. Write out every single exercise and meal in full detail.
 
-USER PROFILE:
-Name: {name}
-Goal: {goal}
-Gender: {gender}
-Age: {age}
-Weight: {weight}kg
-Height: {height}cm
-Activity Level: {activity_level}
-Training Style: {training_style}
-Diet Type: {diet_type}
-Allergies: {allergies}
-Favorite Foods: {fav_foods}
-
 ⚠️ CRITICAL DIETARY RESTRICTIONS ⚠️
 STRICTLY AVOID including ANY foods related to the allergies listed above in the meal plan.
 If nuts are mentioned in allergies, DO NOT include ANY type of nuts (peanuts, almonds, walnuts, etc.).
@@ -186,27 +180,23 @@ PROGRESS TRACKING
 * Adherence tracking
 '''
 
-FITNESS_PLAN_PROMPT = '''
-Create an updated fitness plan based on the user's progress and previous plans.
-
+FIRST_PLAN_USER = '''
 USER PROFILE:
 Name: {name}
 Goal: {goal}
 Gender: {gender}
 Age: {age}
-Current Weight: {weight}kg
+Weight: {weight}kg
 Height: {height}cm
 Activity Level: {activity_level}
 Training Style: {training_style}
 Diet Type: {diet_type}
 Allergies: {allergies}
 Favorite Foods: {fav_foods}
+'''
 
-PREVIOUS PLANS:
-{previous_plans}
-
-RECENT JOURNAL SUMMARY:
-{journal_summary}
+FITNESS_PLAN_SYSTEM = '''
+Create an updated fitness plan based on the user's progress and previous plans.
 
 REQUIREMENTS:
 1. Analyze previous plan adherence and results
@@ -228,9 +218,93 @@ Remember:
 - Provide specific form improvements based on reported issues
 '''
 
-CUSTOM_QUERY_PROMPTS = {
+FITNESS_PLAN_USER = '''
+USER PROFILE:
+Name: {name}
+Goal: {goal}
+Gender: {gender}
+Age: {age}
+Current Weight: {weight}kg
+Height: {height}cm
+Activity Level: {activity_level}
+Training Style: {training_style}
+Diet Type: {diet_type}
+Allergies: {allergies}
+Favorite Foods: {fav_foods}
+
+PREVIOUS PLANS:
+{previous_plans}
+
+RECENT JOURNAL SUMMARY:
+{journal_summary}
+'''
+
+# === Structured output schemas ===
+# Strict JSON schema for the full 7-day meal plan so one request returns
+# every day in a machine-checkable shape (no markdown re-parsing and no
+# retry-on-malformed-format loop).
+_MEAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "description": {"type": "string"},
+        "calories": {"type": "integer"}
+    },
+    "required": ["description", "calories"],
+    "additionalProperties": False
+}
+
+MEAL_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "days": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "day": {"type": "string"},
+                    "breakfast": _MEAL_SCHEMA,
+                    "morning_snack": _MEAL_SCHEMA,
+                    "lunch": _MEAL_SCHEMA,
+                    "afternoon_snack": _MEAL_SCHEMA,
+                    "dinner": _MEAL_SCHEMA,
+                    "total_calories": {"type": "integer"},
+                    "macros": {"type": "string"}
+                },
+                "required": [
+                    "day", "breakfast", "morning_snack", "lunch",
+                    "afternoon_snack", "dinner", "total_calories", "macros"
+                ],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["days"],
+    "additionalProperties": False
+}
+
+# === Precompiled template renderers ===
+# str.format re-parses the format string on every call; string.Template
+# parses once at import time, which adds up on the hot plan-generation paths.
+
+def _compile_template(template: str) -> string.Template:
+    """Convert a str.format-style template into a pre-parsed string.Template"""
+    return string.Template(re.sub(r'\{(\w+)\}', r'${\1}', template))
+
+_FIRST_PLAN_USER_TEMPLATE = _compile_template(FIRST_PLAN_USER)
+_FITNESS_PLAN_USER_TEMPLATE = _compile_template(FITNESS_PLAN_USER)
+
+def render_first_plan_user(**kwargs) -> str:
+    """Render the first-plan user message from profile fields"""
+    return _FIRST_PLAN_USER_TEMPLATE.substitute(**kwargs)
+
+def render_fitness_plan_user(**kwargs) -> str:
+    """Render the update-plan user message from profile fields and history"""
+    return _FITNESS_PLAN_USER_TEMPLATE.substitute(**kwargs)
+
+# Read-only view; never mutated after import
+CUSTOM_QUERY_PROMPTS = MappingProxyType({
     'trainer': SYSTEM_PROMPT_TRAINER,
     'nutritionist': SYSTEM_PROMPT_NUTRITIONIST,
     'health_coach': SYSTEM_PROMPT_HEALTH_COACH,
     'bodybuilder': SYSTEM_PROMPT_BODYBUILDER,
-}
+})
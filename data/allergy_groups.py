@@ -1,23 +1,210 @@
+# Common allergens and their related foods, keyed by the allergy names
+# the meal validator extracts from user profiles. 'items' are the terms
+# the validator flags with word-boundary matching; 'related_ingredients'
+# widen the vocabulary for the linear scanners below.
 ALLERGY_GROUPS = {
-    'nut_allergy': {
+    'nuts': {
         'items': [
-            'peanut', 'almond', 'cashew', 'hazelnut', 'pecan', 'walnut', 'pistachio',
-            'nut butter', 'trail mix', 'granola', 'protein bar', 'mixed nuts'
+            'peanut', 'almond', 'cashew', 'walnut', 'pecan', 'hazelnut', 'macadamia',
+            'pistachio', 'pine nut', 'nut butter', 'almond milk', 'almond flour',
+            'nut oil', 'nutella', 'marzipan', 'nougat'
         ],
         'related_ingredients': [
-            'almond milk', 'almond flour', 'peanut oil', 'nut extract',
-            'marzipan', 'nougat'
+            'trail mix', 'granola', 'protein bar', 'nut extract'
         ]
     },
-    'dairy_allergy': {
+    'peanut': {
         'items': [
-            'milk', 'butter', 'cream', 'yogurt', 'cheese', 'whey', 'casein',
-            'dairy', 'lactose', 'milk powder', 'buttermilk', 'ghee'
+            'peanut', 'peanut butter', 'peanut oil', 'groundnut', 'arachis oil',
+            'beer nuts', 'mixed nuts'
         ],
         'related_ingredients': [
-            'milk solids', 'cream cheese', 'sour cream', 'ice cream',
+            'satay', 'peanut flour'
+        ]
+    },
+    'tree nuts': {
+        'items': [
+            'almond', 'cashew', 'walnut', 'pecan', 'hazelnut', 'macadamia',
+            'pistachio', 'pine nut', 'brazil nut'
+        ],
+        'related_ingredients': [
+            'praline', 'nut paste'
+        ]
+    },
+    'dairy': {
+        'items': [
+            'milk', 'cheese', 'yogurt', 'cream', 'butter', 'whey', 'casein',
+            'lactose', 'ice cream', 'dairy', 'buttermilk', 'ghee', 'custard',
+            'pudding', 'kefir'
+        ],
+        'related_ingredients': [
+            'milk solids', 'milk powder', 'cream cheese', 'sour cream',
             'milk protein', 'dairy protein'
         ]
     },
-    # ... other allergy groups from your existing code ...
+    'gluten': {
+        'items': [
+            'wheat', 'bread', 'pasta', 'flour', 'cereal', 'barley', 'rye', 'oats',
+            'couscous', 'beer', 'bulgur', 'durum', 'semolina', 'farina', 'seitan'
+        ],
+        'related_ingredients': [
+            'breadcrumbs', 'malt', 'wheat germ'
+        ]
+    },
+    'seafood': {
+        'items': [
+            'fish', 'shellfish', 'shrimp', 'crab', 'lobster', 'tuna', 'salmon',
+            'cod', 'prawn', 'clam', 'mussel', 'oyster', 'scallop', 'squid',
+            'octopus', 'anchovy', 'sardine'
+        ],
+        'related_ingredients': [
+            'fish sauce', 'fish oil', 'worcestershire'
+        ]
+    },
+    'eggs': {
+        'items': [
+            'egg', 'mayonnaise', 'custard', 'omelette', 'meringue', 'egg white',
+            'egg yolk', 'quiche', 'frittata', 'hollandaise', 'aioli'
+        ],
+        'related_ingredients': [
+            'albumin', 'egg wash'
+        ]
+    },
+    'soy': {
+        'items': [
+            'soy', 'tofu', 'edamame', 'soy sauce', 'soy milk', 'tempeh', 'miso',
+            'natto', 'tamari', 'soybean', 'soy protein'
+        ],
+        'related_ingredients': [
+            'soy lecithin', 'textured vegetable protein'
+        ]
+    },
 }
+
+import re
+import sys
+from types import MappingProxyType
+
+# Freeze the groups: interned tuples are smaller and iterate faster than
+# lists, and the read-only proxy makes the no-mutation contract explicit so
+# consumers never need defensive copies
+for _group in ALLERGY_GROUPS.values():
+    _group['items'] = tuple(sys.intern(term) for term in _group['items'])
+    _group['related_ingredients'] = tuple(sys.intern(term) for term in _group['related_ingredients'])
+ALLERGY_GROUPS = MappingProxyType(ALLERGY_GROUPS)
+
+try:
+    import ahocorasick
+except ImportError:
+    # Optional C extension; the frozenset scan below still works without it
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:
+    # Optional JIT'd-DFA scanner; Aho-Corasick/frozenset paths cover its absence
+    hyperscan = None
+
+# Flat set of every known allergen term for O(1) membership tests
+ALLERGY_TERMS = frozenset(
+    term.lower()
+    for group in ALLERGY_GROUPS.values()
+    for term in group['items'] + group['related_ingredients']
+)
+
+# Generic terms the validator flags for any nut allergy; substring
+# semantics there are deliberate (catches "nut mix", "beer nuts", ...)
+GENERIC_NUT_TERMS = tuple(sys.intern(term) for term in (
+    'nut', 'nuts', 'mixed nuts', 'nut mix', 'trail mix', 'granola'
+))
+
+# Word-boundary patterns for each group's flaggable items, compiled once
+# at import so the per-plan validation loop never calls re.compile
+ALLERGEN_FOOD_PATTERNS = MappingProxyType({
+    group_name: tuple(
+        (term, re.compile(r'\b' + re.escape(term) + r'\b'))
+        for term in group['items']
+    )
+    for group_name, group in ALLERGY_GROUPS.items()
+})
+
+def _build_automaton():
+    """Compile all allergen terms into a single Aho-Corasick automaton
+    so scanning a meal text is O(len(text)) regardless of vocabulary size."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for group_name, group in ALLERGY_GROUPS.items():
+        for term in group['items'] + group['related_ingredients']:
+            automaton.add_word(term.lower(), (group_name, term.lower()))
+    automaton.make_automaton()
+    return automaton
+
+ALLERGY_AUTOMATON = _build_automaton()
+
+# Stable term ordering so Hyperscan match ids map back to terms
+_HS_TERMS = tuple(sorted(ALLERGY_TERMS))
+
+def _build_hyperscan_db():
+    """Compile every allergen term into a single Hyperscan database.
+
+    Hyperscan JIT-compiles all patterns into one DFA, so scanning a full
+    generated meal plan is a single linear pass regardless of how many
+    allergy groups are defined.
+    """
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[re.escape(term).encode() for term in _HS_TERMS],
+            ids=list(range(len(_HS_TERMS))),
+            flags=[hyperscan.HS_FLAG_CASELESS] * len(_HS_TERMS)
+        )
+        return db
+    except Exception:
+        # Compilation problems should never break allergen checking
+        return None
+
+ALLERGY_HSDB = _build_hyperscan_db()
+
+def contains_allergen(text: str) -> bool:
+    """Return True if any known allergen term occurs in the given text."""
+    lower_text = text.lower()
+    if ALLERGY_HSDB is not None:
+        found = []
+        try:
+            # Returning True from the handler halts the scan on first
+            # match; python-hyperscan reports the halt by raising
+            # ScanTerminated from scan()
+            ALLERGY_HSDB.scan(
+                lower_text.encode(),
+                match_event_handler=lambda term_id, start, end, flags, ctx: found.append(term_id) or True
+            )
+        except hyperscan.ScanTerminated:
+            return True
+        return bool(found)
+    if ALLERGY_AUTOMATON is not None:
+        return next(ALLERGY_AUTOMATON.iter(lower_text), None) is not None
+    return any(term in lower_text for term in ALLERGY_TERMS)
+
+def scan_allergens(text: str):
+    """Yield every (term, start, end) allergen occurrence in the given text."""
+    lower_text = text.lower()
+    if ALLERGY_HSDB is not None:
+        matches = []
+        ALLERGY_HSDB.scan(
+            lower_text.encode(),
+            match_event_handler=lambda term_id, start, end, flags, ctx: matches.append((term_id, start, end))
+        )
+        for term_id, start, end in matches:
+            yield _HS_TERMS[term_id], start, end
+    elif ALLERGY_AUTOMATON is not None:
+        for end_index, (_, term) in ALLERGY_AUTOMATON.iter(lower_text):
+            yield term, end_index - len(term) + 1, end_index + 1
+    else:
+        for term in ALLERGY_TERMS:
+            start = lower_text.find(term)
+            while start != -1:
+                yield term, start, start + len(term)
+                start = lower_text.find(term, start + 1)
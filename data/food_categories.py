@@ -36,16 +36,51 @@ FOOD_CATEGORIES = {
     }
 }
 
-# data/allergy_groups.py
-ALLERGY_GROUPS = {
-    'nut_allergy': {
-        'items': [
-            'peanut', 'almond', 'cashew', 'hazelnut', 'pecan', 'walnut', 'pistachio',
-            'nut butter', 'trail mix', 'granola'
-        ],
-        'related_ingredients': [
-            'almond milk', 'almond flour', 'peanut oil', 'nut extract'
-        ]
-    },
-    # ... [rest of allergies]
+import sys
+from types import MappingProxyType
+
+# Freeze the categories: interned tuples are smaller and iterate faster than
+# lists, and the read-only proxy makes the no-mutation contract explicit
+for _category in FOOD_CATEGORIES.values():
+    _category['items'] = tuple(sys.intern(item) for item in _category['items'])
+    _category['categories'] = tuple(sys.intern(c) for c in _category['categories'])
+FOOD_CATEGORIES = MappingProxyType(FOOD_CATEGORIES)
+
+# Flat set of every known food term for O(1) membership tests
+FOOD_TERMS = frozenset(
+    item.lower()
+    for category in FOOD_CATEGORIES.values()
+    for item in category['items']
+)
+
+# Reverse index so "what category is this ingredient" is a single dict hit
+# instead of a scan over every category's item list
+INGREDIENT_TO_CATEGORY = {
+    item: category_name
+    for category_name, category in FOOD_CATEGORIES.items()
+    for item in category['items']
 }
+INGREDIENT_SET = frozenset(INGREDIENT_TO_CATEGORY)
+
+import re
+
+# Diet-type vocabularies for meal plan validation, with word-boundary
+# patterns compiled once at import instead of per validation call
+MEAT_PRODUCTS = tuple(sys.intern(term) for term in (
+    'chicken', 'beef', 'pork', 'turkey', 'lamb', 'veal', 'ham', 'bacon',
+    'sausage', 'fish', 'meat', 'steak', 'burger', 'meatball', 'pepperoni',
+    'salami'
+))
+
+ANIMAL_PRODUCTS = tuple(sys.intern(term) for term in (
+    'meat', 'fish', 'egg', 'milk', 'cheese', 'yogurt', 'butter', 'honey',
+    'whey', 'cream', 'gelatin', 'lard', 'ghee', 'casein', 'lactose',
+    'poultry', 'beef'
+))
+
+def _compile_word_patterns(terms):
+    """Pair each term with its precompiled word-boundary pattern"""
+    return tuple((term, re.compile(r'\b' + re.escape(term) + r'\b')) for term in terms)
+
+MEAT_PRODUCT_PATTERNS = _compile_word_patterns(MEAT_PRODUCTS)
+ANIMAL_PRODUCT_PATTERNS = _compile_word_patterns(ANIMAL_PRODUCTS)
@@ -1,15 +1,51 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker, scoped_session
 from contextlib import contextmanager
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
     def __init__(self, db_url="sqlite:///fitness_plans.db"):
-        self.engine = create_engine(db_url)
-        self.SessionFactory = sessionmaker(bind=self.engine)
+        # Explicit pool so Streamlit reruns reuse connections instead of
+        # reopening the SQLite file on every interaction
+        self.engine = create_engine(
+            db_url,
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+
+        if db_url.startswith("sqlite"):
+            @event.listens_for(self.engine, "connect")
+            def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                # WAL lets reads proceed while a write is in flight, which
+                # matters when multiple Streamlit sessions share the file
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA cache_size=-64000")
+                cursor.execute("PRAGMA mmap_size=268435456")
+                cursor.close()
+
+        # autoflush=False avoids implicit flushes on every read inside
+        # session_scope (commit still flushes); expire_on_commit=False keeps
+        # loaded attributes readable after commit without a re-SELECT per
+        # Streamlit rerun
+        self.SessionFactory = sessionmaker(
+            bind=self.engine,
+            autoflush=False,
+            expire_on_commit=False,
+            future=True
+        )
         self.Session = scoped_session(self.SessionFactory)
+        self._initialized = threading.Event()
 
     @contextmanager
     def session_scope(self):
@@ -26,8 +62,43 @@ class DatabaseManager:
             session.close()
 
     def init_db(self):
-        """Initialize database tables"""
+        """Initialize database tables (once per process)"""
+        # create_all's checkfirst reflection issues a PRAGMA table_info per
+        # mapped table, so skip it entirely after the first successful run
+        if self._initialized.is_set():
+            return
         from database.models import Base
-        Base.metadata.create_all(self.engine)
+        Base.metadata.create_all(self.engine, checkfirst=True)
+        self._apply_migrations()
+        self._initialized.set()
+
+    def _apply_migrations(self):
+        """Bring pre-existing databases up to the current schema.
+
+        create_all only creates missing tables — it never alters ones
+        that already exist — so constraints and indexes added to the
+        models after a database was first created have to be applied
+        here. Without the unique index the journal upsert's ON CONFLICT
+        target doesn't exist and every save fails on older files.
+        """
+        with self.engine.begin() as conn:
+            try:
+                conn.exec_driver_sql(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_journal_name_date "
+                    "ON journals (name, entry_date)"
+                )
+            except Exception as e:
+                # Pre-existing duplicate (name, entry_date) rows block the
+                # unique index; leave the data alone and warn so it can be
+                # cleaned up manually
+                logger.warning(f"Could not create unique journal index: {str(e)}")
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_journal_name_date "
+                "ON journals (name, entry_date DESC)"
+            )
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_plans_name_created "
+                "ON plans (name, created_date DESC, id DESC)"
+            )
 
 db_manager = DatabaseManager()
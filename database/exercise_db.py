@@ -3,36 +3,329 @@ Exercise database with detailed information for workout plan generation.
 Fetches exercises from ExerciseDB API with fallback to local database.
 """
 
+import functools
 import json
 import os
+import re
 import requests
 import logging
-from typing import List, Dict, Any
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple
 from config.settings import EXERCISEDB_API_KEY  # Add this to your settings file
 
+try:
+    import orjson
+except ImportError:
+    # Optional SIMD-accelerated parser; stdlib json covers its absence
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:
+    # Optional multi-pattern matcher; the combined regex covers its absence
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+# Equipment keywords the classifiers branch on. One scan of the equipment
+# string collects every hit, shared by both classifiers per row, instead
+# of chains of `needle in haystack` tests during the RapidAPI import.
+_EQUIP_TERMS = ("barbell", "dumbbell", "kettlebell", "cable", "machine", "body weight", "none")
+_WEIGHT_EQUIP = frozenset({"barbell", "dumbbell", "kettlebell"})
+_MACHINE_EQUIP = frozenset({"cable", "machine"})
+_BODYWEIGHT_EQUIP = frozenset({"body weight", "none"})
+_BEGINNER_NAME_RE = re.compile(r"plank|push-?up")
+
+if ahocorasick is not None:
+    _EQUIP_AUTOMATON = ahocorasick.Automaton()
+    for _term in _EQUIP_TERMS:
+        _EQUIP_AUTOMATON.add_word(_term, _term)
+    _EQUIP_AUTOMATON.make_automaton()
+else:
+    _EQUIP_AUTOMATON = None
+# Longest-first alternation so "body weight" wins over a bare "weight"
+_EQUIP_RE = re.compile("|".join(map(re.escape, sorted(_EQUIP_TERMS, key=len, reverse=True))))
+
+def _scan_equipment_terms(equipment: str) -> frozenset:
+    """Collect every equipment keyword present in one pass over the string."""
+    if _EQUIP_AUTOMATON is not None:
+        return frozenset(term for _, term in _EQUIP_AUTOMATON.iter(equipment))
+    return frozenset(_EQUIP_RE.findall(equipment))
+
+# Fallback records used when the cache file is missing and the API is
+# unavailable. Built once at import and never mutated (loading converts
+# them to Exercise instances), so the read-only proxy is shared as-is.
+_DEFAULT_EXERCISES: Mapping[str, Dict[str, Any]] = MappingProxyType({
+    "bench_press": {
+        "id": "bench_press",
+        "name": "Bench Press",
+        "equipment": ["Barbell", "Bench"],
+        "body_parts": ["Chest"],
+        "target_muscles": ["Pectoralis Major"],
+        "secondary_muscles": ["Anterior Deltoids", "Triceps"],
+        "exercise_type": "weight_reps",
+        "difficulty": "intermediate",
+        "instructions": [
+            "Lie flat on bench with feet planted firmly on ground",
+            "Grip barbell slightly wider than shoulder width",
+            "Unrack the bar and position it above chest",
+            "Lower bar with control to mid-chest",
+            "Press bar back up to starting position"
+        ],
+        "form_tips": [
+            "Keep wrists straight and elbows at 45-degree angle",
+            "Maintain natural arch in lower back",
+            "Drive through chest and keep shoulders retracted"
+        ],
+        "common_mistakes": [
+            "Bouncing bar off chest",
+            "Excessive back arch",
+            "Uneven pressing"
+        ],
+        "variations": [
+            "Dumbbell Bench Press",
+            "Incline Bench Press",
+            "Close-Grip Bench Press"
+        ]
+    },
+    "squat": {
+        "id": "squat",
+        "name": "Barbell Squat",
+        "equipment": ["Barbell", "Squat Rack"],
+        "body_parts": ["Legs"],
+        "target_muscles": ["Quadriceps"],
+        "secondary_muscles": ["Glutes", "Hamstrings", "Calves"],
+        "exercise_type": "weight_reps",
+        "difficulty": "intermediate",
+        "instructions": [
+            "Position bar on upper back, slightly below neck",
+            "Grip bar with hands wider than shoulders",
+            "Unrack bar and step back, feet shoulder-width apart",
+            "Bend knees and hips to lower body, keeping chest up",
+            "Lower until thighs are parallel to ground",
+            "Push through heels to return to starting position"
+        ],
+        "form_tips": [
+            "Keep weight on heels and mid-foot",
+            "Maintain neutral spine throughout movement",
+            "Keep knees in line with toes"
+        ],
+        "common_mistakes": [
+            "Knees caving inward",
+            "Rising onto toes",
+            "Rounding lower back"
+        ],
+        "variations": [
+            "Front Squat",
+            "Goblet Squat",
+            "Bulgarian Split Squat"
+        ]
+    },
+    "pushup": {
+        "id": "pushup",
+        "name": "Push-Up",
+        "equipment": ["None"],
+        "body_parts": ["Chest"],
+        "target_muscles": ["Pectoralis Major"],
+        "secondary_muscles": ["Anterior Deltoids", "Triceps", "Core"],
+        "exercise_type": "bodyweight",
+        "difficulty": "beginner",
+        "instructions": [
+            "Start in plank position with hands slightly wider than shoulders",
+            "Keep body in straight line from head to heels",
+            "Lower body by bending elbows until chest nearly touches floor",
+            "Push back up to starting position",
+            "Repeat for desired number of repetitions"
+        ],
+        "form_tips": [
+            "Keep core tight throughout movement",
+            "Elbows should be at 45-degree angle to body",
+            "Breathe out when pushing up"
+        ],
+        "common_mistakes": [
+            "Sagging hips",
+            "Flaring elbows too wide",
+            "Incomplete range of motion"
+        ],
+        "variations": [
+            "Incline Push-Up",
+            "Decline Push-Up",
+            "Diamond Push-Up"
+        ]
+    }
+})
+
+@functools.lru_cache(maxsize=1)
+def get_exercise_database() -> "ExerciseDatabase":
+    """Process-wide ExerciseDatabase singleton
+
+    Constructing ExerciseDatabase parses exercise_db.json (and may hit the
+    API), so share one instance instead of re-reading the file on every
+    Streamlit rerun.
+    """
+    return ExerciseDatabase()
+
+def _loads(data: bytes):
+    """Parse JSON bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj) -> bytes:
+    """Serialize to JSON bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+@dataclass(frozen=True, slots=True)
+class Exercise:
+    """A single exercise record.
+
+    Slotted instances drop the per-row dict overhead of the raw JSON
+    records (thousands of rows after an API import) and make attribute
+    access a fixed-offset load. The _lc_* frozensets are lowercased
+    copies of the tag fields, computed once at construction so filters
+    do hashed membership tests instead of re-lowercasing per call.
+    """
+    id: str
+    name: str
+    equipment: Tuple[str, ...] = ()
+    body_parts: Tuple[str, ...] = ()
+    target_muscles: Tuple[str, ...] = ()
+    secondary_muscles: Tuple[str, ...] = ()
+    exercise_type: str = "bodyweight"
+    difficulty: str = "intermediate"
+    instructions: Tuple[str, ...] = ()
+    form_tips: Tuple[str, ...] = ()
+    common_mistakes: Tuple[str, ...] = ()
+    variations: Tuple[str, ...] = ()
+    _lc_body_parts: FrozenSet[str] = frozenset()
+    _lc_equipment: FrozenSet[str] = frozenset()
+    _lc_target_muscles: FrozenSet[str] = frozenset()
+    _lc_secondary_muscles: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "Exercise":
+        """Build an Exercise from a raw JSON record.
+
+        The tag fields draw from a couple dozen distinct values across
+        thousands of rows, so they are interned: duplicates collapse to
+        one string object and equality checks become pointer compares.
+        """
+        intern = sys.intern
+        equipment = tuple(intern(e) for e in record.get("equipment", ()))
+        body_parts = tuple(intern(bp) for bp in record.get("body_parts", ()))
+        target_muscles = tuple(intern(m) for m in record.get("target_muscles", ()))
+        secondary_muscles = tuple(intern(m) for m in record.get("secondary_muscles", ()))
+        return cls(
+            id=record.get("id", ""),
+            name=record.get("name", ""),
+            equipment=equipment,
+            body_parts=body_parts,
+            target_muscles=target_muscles,
+            secondary_muscles=secondary_muscles,
+            exercise_type=intern(record.get("exercise_type", "bodyweight")),
+            difficulty=intern(record.get("difficulty", "intermediate")),
+            instructions=tuple(record.get("instructions", ())),
+            form_tips=tuple(record.get("form_tips", ())),
+            common_mistakes=tuple(record.get("common_mistakes", ())),
+            variations=tuple(record.get("variations", ())),
+            _lc_body_parts=frozenset(intern(bp.lower()) for bp in body_parts),
+            _lc_equipment=frozenset(intern(eq.lower()) for eq in equipment),
+            _lc_target_muscles=frozenset(intern(m.lower()) for m in target_muscles),
+            _lc_secondary_muscles=frozenset(intern(m.lower()) for m in secondary_muscles),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable dict in the cache-file format."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "equipment": list(self.equipment),
+            "body_parts": list(self.body_parts),
+            "target_muscles": list(self.target_muscles),
+            "secondary_muscles": list(self.secondary_muscles),
+            "exercise_type": self.exercise_type,
+            "difficulty": self.difficulty,
+            "instructions": list(self.instructions),
+            "form_tips": list(self.form_tips),
+            "common_mistakes": list(self.common_mistakes),
+            "variations": list(self.variations),
+        }
+
 class ExerciseDatabase:
     def __init__(self):
         self.api_key = EXERCISEDB_API_KEY
         # Update to use RapidAPI endpoint
         self.api_base_url = "https://exercisedb.p.rapidapi.com"
-        self.exercises: Dict[str, Dict[str, Any]] = self._load_exercises()
-        
-    def _load_exercises(self) -> Dict[str, Dict[str, Any]]:
+        # Pooled session with the RapidAPI headers set once; keep-alive
+        # avoids a fresh TLS handshake per request
+        self._session = requests.Session()
+        if self.api_key:
+            self._session.headers.update({
+                "X-RapidAPI-Key": self.api_key,
+                "X-RapidAPI-Host": "exercisedb.p.rapidapi.com"
+            })
+        self.exercises: Dict[str, Exercise] = self._load_exercises()
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        """Build reverse indexes once so tag lookups are O(1) dict hits
+        instead of full scans that re-lowercase every tag per call.
+
+        The normalized _lc_* frozensets live on each Exercise instance,
+        so ad-hoc filters can do a single hashed membership test instead
+        of rebuilding lowercased lists per call.
+        """
+        self._by_body_part = defaultdict(list)
+        self._by_equipment = defaultdict(list)
+        self._by_difficulty = defaultdict(list)
+        self._by_type = defaultdict(list)
+        self._by_target_muscle = defaultdict(list)
+        self._by_secondary_muscle = defaultdict(list)
+
+        body_parts = set()
+        equipment = set()
+        muscles = set()
+
+        for exercise in self.exercises.values():
+            for bp in exercise._lc_body_parts:
+                self._by_body_part[bp].append(exercise)
+            for eq in exercise._lc_equipment:
+                self._by_equipment[eq].append(exercise)
+            self._by_difficulty[exercise.difficulty.lower()].append(exercise)
+            self._by_type[exercise.exercise_type.lower()].append(exercise)
+            for muscle in exercise._lc_target_muscles:
+                self._by_target_muscle[muscle].append(exercise)
+            for muscle in exercise._lc_secondary_muscles:
+                self._by_secondary_muscle[muscle].append(exercise)
+
+            body_parts.update(exercise.body_parts)
+            equipment.update(exercise.equipment)
+            muscles.update(exercise.target_muscles)
+            muscles.update(exercise.secondary_muscles)
+
+        self._all_body_parts = tuple(sorted(body_parts))
+        self._all_equipment = tuple(sorted(equipment))
+        self._all_muscles = tuple(sorted(muscles))
+
+    def _load_exercises(self) -> Dict[str, Exercise]:
         """Load exercises from JSON file or use default exercises if file doesn't exist."""
         # First, try to load from local cache file
         json_path = os.path.join(os.path.dirname(__file__), 'exercise_db.json')
-        
+
         try:
             if os.path.exists(json_path):
-                with open(json_path, 'r') as f:
-                    exercises = json.load(f)
+                with open(json_path, 'rb') as f:
+                    exercises = _loads(f.read())
                 logger.info(f"Loaded {len(exercises)} exercises from local cache")
-                return exercises
+                return self._to_records(exercises)
         except Exception as e:
             logger.error(f"Error loading exercises from {json_path}: {str(e)}")
-        
+
         # If local file doesn't exist, try to fetch from API without authentication first
         if self.api_key:
             try:
@@ -40,41 +333,40 @@ class ExerciseDatabase:
                 if exercises and len(exercises) > 0:
                     # Cache the exercises locally
                     self._cache_exercises(exercises, json_path)
-                    return exercises
+                    return self._to_records(exercises)
             except Exception as e:
                 logger.error(f"Error fetching exercises from authenticated API: {str(e)}")
-        
+
         # Fallback to default exercises if API fails
         logger.info("Using default exercise database")
-        return self._get_default_exercises()
+        return self._to_records(self._get_default_exercises())
+
+    @staticmethod
+    def _to_records(raw: Dict[str, Dict[str, Any]]) -> Dict[str, Exercise]:
+        """Convert raw JSON records into slotted Exercise instances."""
+        return {
+            exercise_id: Exercise.from_dict(record)
+            for exercise_id, record in raw.items()
+        }
     
     def _fetch_from_api_authenticated(self) -> Dict[str, Dict[str, Any]]:
         """Fetch exercises from ExerciseDB API with RapidAPI authentication."""
         logger.info("Fetching exercises from ExerciseDB API (RapidAPI)")
-        
-        # RapidAPI specific headers
-        headers = {
-            "X-RapidAPI-Key": self.api_key,
-            "X-RapidAPI-Host": "exercisedb.p.rapidapi.com"
-        }
-        
+
         try:
             # First, try getting all exercises (limited by the API)
             logger.info("Fetching all exercises from API")
-            response = requests.get(
-                f"{self.api_base_url}/exercises",
-                headers=headers
-            )
+            response = self._session.get(f"{self.api_base_url}/exercises")
             response.raise_for_status()
             
-            # Get the response content as text first for debugging
-            content = response.text
-            logger.debug(f"API Response content: {content[:200]}...")  # Log first 200 chars
-            
-            # Parse JSON response
+            # Guard the debug peek by level so we don't decode the body twice
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("API Response content: %s...", response.content[:200])
+
+            # Parse JSON response straight from the raw bytes
             try:
-                exercises_data = response.json()
-                
+                exercises_data = _loads(response.content)
+
                 # Check if we got a list (normal RapidAPI response)
                 if not isinstance(exercises_data, list):
                     logger.error(f"Expected list response, got {type(exercises_data)}")
@@ -82,41 +374,52 @@ class ExerciseDatabase:
                 
                 logger.info(f"Successfully retrieved {len(exercises_data)} exercises from RapidAPI")
                 
-                # Transform API format to our internal format
+                # Transform API format to our internal format. Hot loop at
+                # N~1300: bind lookups as locals so each iteration pays
+                # fast LOAD_FASTs instead of attribute/global lookups
                 all_exercises = {}
+                scan_terms = _scan_equipment_terms
+                det_type = self._determine_exercise_type_rapidapi
+                det_difficulty = self._determine_difficulty_rapidapi
                 for exercise in exercises_data:
                     # Ensure exercise is a dictionary
                     if not isinstance(exercise, dict):
                         logger.warning(f"Skipping non-dictionary exercise: {exercise}")
                         continue
-                    
+
+                    g = exercise.get
+
                     # Get ID from the exercise
-                    exercise_id = str(exercise.get("id", "")).lower().replace(" ", "_")
+                    exercise_id = str(g("id", "")).lower().replace(" ", "_")
                     if not exercise_id:
                         # Try name as fallback if no ID
-                        name = exercise.get("name", "")
+                        name = g("name", "")
                         if name:
                             exercise_id = name.lower().replace(" ", "_")
-                    
+
                     # Skip empty IDs or duplicates
                     if not exercise_id or exercise_id in all_exercises:
                         continue
-                    
-                    # Map fields from RapidAPI format
-                    body_part = exercise.get("bodyPart", "")
-                    equipment = exercise.get("equipment", "")
-                    target = exercise.get("target", "")
-                    
+
+                    # Map fields from RapidAPI format; lowercase equipment and
+                    # name once here so the classifiers don't re-read the dict
+                    body_part = g("bodyPart", "")
+                    equipment = g("equipment", "")
+                    target = g("target", "")
+                    name = g("name", "")
+                    equipment_lc = str(equipment).lower()
+                    equip_terms = scan_terms(equipment_lc)
+
                     all_exercises[exercise_id] = {
                         "id": exercise_id,
-                        "name": exercise.get("name", ""),
+                        "name": name,
                         "equipment": [equipment] if equipment else [],
                         "body_parts": [body_part] if body_part else [],
                         "target_muscles": [target] if target else [],
-                        "secondary_muscles": exercise.get("secondaryMuscles", []),
-                        "exercise_type": self._determine_exercise_type_rapidapi(exercise),
-                        "difficulty": self._determine_difficulty_rapidapi(exercise),
-                        "instructions": exercise.get("instructions", []),
+                        "secondary_muscles": g("secondaryMuscles", []),
+                        "exercise_type": det_type(equipment_lc, equip_terms),
+                        "difficulty": det_difficulty(equipment_lc, equip_terms, str(name).lower()),
+                        "instructions": g("instructions", []),
                         "form_tips": [],  # API doesn't provide this
                         "common_mistakes": [],  # API doesn't provide this
                         "variations": []  # API doesn't provide this
@@ -125,9 +428,10 @@ class ExerciseDatabase:
                 logger.info(f"Successfully processed {len(all_exercises)} exercises from RapidAPI")
                 return all_exercises
                 
-            except json.JSONDecodeError as je:
+            except ValueError as je:  # covers json and orjson decode errors
                 logger.error(f"Failed to decode JSON response: {str(je)}")
-                logger.debug(f"Response content: {content[:500]}...")  # Log more content for debugging
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Response content: %s...", response.content[:500])
                 return {}
             
         except requests.exceptions.RequestException as e:
@@ -139,35 +443,30 @@ class ExerciseDatabase:
             logger.error(traceback.format_exc())
             return {}
     
-    def _determine_exercise_type_rapidapi(self, exercise: Dict[str, Any]) -> str:
-        """Determine the exercise type based on equipment for RapidAPI format."""
+    def _determine_exercise_type_rapidapi(self, equipment: str, equip_terms: frozenset) -> str:
+        """Determine the exercise type from the pre-scanned equipment terms."""
         try:
-            equipment = str(exercise.get("equipment", "")).lower()
-            
             if not equipment or equipment == "body weight" or equipment == "none":
                 return "bodyweight"
-            elif "barbell" in equipment or "dumbbell" in equipment or "kettlebell" in equipment:
+            elif equip_terms & _WEIGHT_EQUIP:
                 return "weight_reps"
-            elif "cable" in equipment or "machine" in equipment:
+            elif equip_terms & _MACHINE_EQUIP:
                 return "machine_reps"
             else:
                 return "bodyweight"
         except Exception as e:
             logger.error(f"Error in _determine_exercise_type_rapidapi: {str(e)}")
             return "bodyweight"  # Default to bodyweight if error
-    
-    def _determine_difficulty_rapidapi(self, exercise: Dict[str, Any]) -> str:
-        """Determine difficulty level based on exercise attributes for RapidAPI format."""
+
+    def _determine_difficulty_rapidapi(self, equipment: str, equip_terms: frozenset, name: str) -> str:
+        """Determine difficulty from the pre-scanned equipment terms and name."""
         try:
-            equipment = str(exercise.get("equipment", "")).lower()
-            name = str(exercise.get("name", "")).lower()
-            
-            if "barbell" in equipment or "cable" in equipment:
+            if "barbell" in equip_terms or "cable" in equip_terms:
                 return "intermediate"
-            elif "dumbbell" in equipment:
+            elif "dumbbell" in equip_terms:
                 return "beginner"
-            elif not equipment or "body weight" in equipment or "none" in equipment:
-                if "plank" in name or "pushup" in name or "push-up" in name:
+            elif not equipment or equip_terms & _BODYWEIGHT_EQUIP:
+                if _BEGINNER_NAME_RE.search(name):
                     return "beginner"
                 else:
                     return "intermediate"
@@ -180,183 +479,121 @@ class ExerciseDatabase:
     def _cache_exercises(self, exercises: Dict[str, Dict[str, Any]], file_path: str) -> None:
         """Cache exercises to a local JSON file."""
         try:
-            with open(file_path, 'w') as f:
-                json.dump(exercises, f)
+            with open(file_path, 'wb') as f:
+                f.write(_dumps(exercises))
             logger.info(f"Cached {len(exercises)} exercises to {file_path}")
         except Exception as e:
             logger.error(f"Error caching exercises to {file_path}: {str(e)}")
     
     def _get_default_exercises(self) -> Dict[str, Dict[str, Any]]:
-        """Return a default set of exercises when all else fails."""
-        return {
-            "bench_press": {
-                "id": "bench_press",
-                "name": "Bench Press",
-                "equipment": ["Barbell", "Bench"],
-                "body_parts": ["Chest"],
-                "target_muscles": ["Pectoralis Major"],
-                "secondary_muscles": ["Anterior Deltoids", "Triceps"],
-                "exercise_type": "weight_reps",
-                "difficulty": "intermediate",
-                "instructions": [
-                    "Lie flat on bench with feet planted firmly on ground",
-                    "Grip barbell slightly wider than shoulder width",
-                    "Unrack the bar and position it above chest",
-                    "Lower bar with control to mid-chest",
-                    "Press bar back up to starting position"
-                ],
-                "form_tips": [
-                    "Keep wrists straight and elbows at 45-degree angle",
-                    "Maintain natural arch in lower back",
-                    "Drive through chest and keep shoulders retracted"
-                ],
-                "common_mistakes": [
-                    "Bouncing bar off chest",
-                    "Excessive back arch",
-                    "Uneven pressing"
-                ],
-                "variations": [
-                    "Dumbbell Bench Press",
-                    "Incline Bench Press",
-                    "Close-Grip Bench Press"
-                ]
-            },
-            "squat": {
-                "id": "squat",
-                "name": "Barbell Squat",
-                "equipment": ["Barbell", "Squat Rack"],
-                "body_parts": ["Legs"],
-                "target_muscles": ["Quadriceps"],
-                "secondary_muscles": ["Glutes", "Hamstrings", "Calves"],
-                "exercise_type": "weight_reps",
-                "difficulty": "intermediate",
-                "instructions": [
-                    "Position bar on upper back, slightly below neck",
-                    "Grip bar with hands wider than shoulders",
-                    "Unrack bar and step back, feet shoulder-width apart",
-                    "Bend knees and hips to lower body, keeping chest up",
-                    "Lower until thighs are parallel to ground",
-                    "Push through heels to return to starting position"
-                ],
-                "form_tips": [
-                    "Keep weight on heels and mid-foot",
-                    "Maintain neutral spine throughout movement",
-                    "Keep knees in line with toes"
-                ],
-                "common_mistakes": [
-                    "Knees caving inward",
-                    "Rising onto toes",
-                    "Rounding lower back"
-                ],
-                "variations": [
-                    "Front Squat",
-                    "Goblet Squat",
-                    "Bulgarian Split Squat"
-                ]
-            },
-            "pushup": {
-                "id": "pushup",
-                "name": "Push-Up",
-                "equipment": ["None"],
-                "body_parts": ["Chest"],
-                "target_muscles": ["Pectoralis Major"],
-                "secondary_muscles": ["Anterior Deltoids", "Triceps", "Core"],
-                "exercise_type": "bodyweight",
-                "difficulty": "beginner",
-                "instructions": [
-                    "Start in plank position with hands slightly wider than shoulders",
-                    "Keep body in straight line from head to heels",
-                    "Lower body by bending elbows until chest nearly touches floor",
-                    "Push back up to starting position",
-                    "Repeat for desired number of repetitions"
-                ],
-                "form_tips": [
-                    "Keep core tight throughout movement",
-                    "Elbows should be at 45-degree angle to body",
-                    "Breathe out when pushing up"
-                ],
-                "common_mistakes": [
-                    "Sagging hips",
-                    "Flaring elbows too wide",
-                    "Incomplete range of motion"
-                ],
-                "variations": [
-                    "Incline Push-Up",
-                    "Decline Push-Up",
-                    "Diamond Push-Up"
-                ]
-            }
-        }
-    
-    def get_exercise(self, exercise_id: str) -> Dict[str, Any]:
-        """Get exercise details by ID."""
-        return self.exercises.get(exercise_id, {})
-    
-    def get_exercises_by_body_part(self, body_part: str) -> List[Dict[str, Any]]:
+        """Return the default set of exercises when all else fails.
+
+        The defaults live in a module-level read-only constant so the
+        literals are built once at import; callers never mutate the raw
+        records (they are converted to Exercise instances), so no copy
+        is needed.
+        """
+        return _DEFAULT_EXERCISES
+
+    def get_exercise(self, exercise_id: str) -> Optional[Exercise]:
+        """Get exercise details by ID, or None if unknown."""
+        return self.exercises.get(exercise_id)
+
+    def get_exercises_by_body_part(self, body_part: str) -> List[Exercise]:
         """Get all exercises for a specific body part."""
-        return [
-            exercise for exercise in self.exercises.values()
-            if body_part.lower() in [bp.lower() for bp in exercise["body_parts"]]
-        ]
-    
-    def get_exercises_by_equipment(self, equipment: str) -> List[Dict[str, Any]]:
+        return self._by_body_part.get(body_part.lower(), [])
+
+    def get_exercises_by_equipment(self, equipment: str) -> List[Exercise]:
         """Get all exercises that use specific equipment."""
-        return [
-            exercise for exercise in self.exercises.values()
-            if equipment.lower() in [e.lower() for e in exercise["equipment"]]
-        ]
-    
-    def get_exercises_by_difficulty(self, difficulty: str) -> List[Dict[str, Any]]:
+        return self._by_equipment.get(equipment.lower(), [])
+
+    def get_exercises_by_difficulty(self, difficulty: str) -> List[Exercise]:
         """Get all exercises of a specific difficulty level."""
-        return [
-            exercise for exercise in self.exercises.values()
-            if exercise["difficulty"].lower() == difficulty.lower()
-        ]
-    
+        return self._by_difficulty.get(difficulty.lower(), [])
+
     def get_exercise_variations(self, exercise_id: str) -> List[str]:
         """Get variations of a specific exercise."""
         exercise = self.get_exercise(exercise_id)
-        return exercise.get("variations", [])
-    
-    def get_exercises_by_type(self, exercise_type: str) -> List[Dict[str, Any]]:
+        return list(exercise.variations) if exercise else []
+
+    def get_exercises_by_type(self, exercise_type: str) -> List[Exercise]:
         """Get all exercises of a specific type (e.g., 'weight_reps', 'bodyweight')."""
-        return [
-            exercise for exercise in self.exercises.values()
-            if exercise["exercise_type"].lower() == exercise_type.lower()
-        ]
-    
-    def get_exercises_by_target_muscle(self, muscle: str) -> List[Dict[str, Any]]:
+        return self._by_type.get(exercise_type.lower(), [])
+
+    def get_exercises_by_target_muscle(self, muscle: str) -> List[Exercise]:
         """Get all exercises that target a specific muscle."""
-        return [
-            exercise for exercise in self.exercises.values()
-            if muscle.lower() in [m.lower() for m in exercise["target_muscles"]]
-        ]
-    
-    def get_exercises_by_secondary_muscle(self, muscle: str) -> List[Dict[str, Any]]:
+        return self._by_target_muscle.get(muscle.lower(), [])
+
+    def get_exercises_by_secondary_muscle(self, muscle: str) -> List[Exercise]:
         """Get all exercises that work a muscle as a secondary muscle."""
-        return [
-            exercise for exercise in self.exercises.values()
-            if muscle.lower() in [m.lower() for m in exercise["secondary_muscles"]]
-        ]
-    
-    def get_all_body_parts(self) -> List[str]:
-        """Get a list of all unique body parts."""
-        body_parts = set()
-        for exercise in self.exercises.values():
-            body_parts.update(exercise["body_parts"])
-        return sorted(list(body_parts))
-    
-    def get_all_equipment(self) -> List[str]:
-        """Get a list of all unique equipment."""
-        equipment = set()
-        for exercise in self.exercises.values():
-            equipment.update(exercise["equipment"])
-        return sorted(list(equipment))
-    
-    def get_all_muscles(self) -> List[str]:
-        """Get a list of all unique muscles (both target and secondary)."""
-        muscles = set()
-        for exercise in self.exercises.values():
-            muscles.update(exercise["target_muscles"])
-            muscles.update(exercise["secondary_muscles"])
-        return sorted(list(muscles)) 
\ No newline at end of file
+        return self._by_secondary_muscle.get(muscle.lower(), [])
+
+    # Lazy variants for callers that only need the first match or two
+    # (e.g. picking one exercise per plan slot): next(iter_..., None)
+    # short-circuits without touching the rest of the bucket.
+
+    def iter_exercises_by_body_part(self, body_part: str) -> Iterator[Exercise]:
+        """Iterate exercises for a specific body part."""
+        yield from self._by_body_part.get(body_part.lower(), ())
+
+    def iter_exercises_by_equipment(self, equipment: str) -> Iterator[Exercise]:
+        """Iterate exercises that use specific equipment."""
+        yield from self._by_equipment.get(equipment.lower(), ())
+
+    def iter_exercises_by_difficulty(self, difficulty: str) -> Iterator[Exercise]:
+        """Iterate exercises of a specific difficulty level."""
+        yield from self._by_difficulty.get(difficulty.lower(), ())
+
+    def iter_exercises_by_type(self, exercise_type: str) -> Iterator[Exercise]:
+        """Iterate exercises of a specific type."""
+        yield from self._by_type.get(exercise_type.lower(), ())
+
+    def iter_exercises_by_target_muscle(self, muscle: str) -> Iterator[Exercise]:
+        """Iterate exercises that target a specific muscle."""
+        yield from self._by_target_muscle.get(muscle.lower(), ())
+
+    def filter_exercises(
+        self,
+        body_part: Optional[str] = None,
+        equipment: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        exercise_type: Optional[str] = None,
+        target_muscle: Optional[str] = None,
+    ) -> List[Exercise]:
+        """Get all exercises matching every provided filter.
+
+        Combined queries intersect the prebuilt reverse indexes, so the
+        cost is bounded by the smallest matching bucket rather than a
+        scan of the whole collection per filter.
+        """
+        buckets = []
+        if body_part is not None:
+            buckets.append(self._by_body_part.get(body_part.lower(), []))
+        if equipment is not None:
+            buckets.append(self._by_equipment.get(equipment.lower(), []))
+        if difficulty is not None:
+            buckets.append(self._by_difficulty.get(difficulty.lower(), []))
+        if exercise_type is not None:
+            buckets.append(self._by_type.get(exercise_type.lower(), []))
+        if target_muscle is not None:
+            buckets.append(self._by_target_muscle.get(target_muscle.lower(), []))
+
+        if not buckets:
+            return list(self.exercises.values())
+
+        # Walk the smallest bucket and check membership in the rest
+        buckets.sort(key=len)
+        smallest, rest = buckets[0], [set(b) for b in buckets[1:]]
+        return [ex for ex in smallest if all(ex in s for s in rest)]
+
+    def get_all_body_parts(self) -> Tuple[str, ...]:
+        """Get all unique body parts, sorted."""
+        return self._all_body_parts
+
+    def get_all_equipment(self) -> Tuple[str, ...]:
+        """Get all unique equipment, sorted."""
+        return self._all_equipment
+
+    def get_all_muscles(self) -> Tuple[str, ...]:
+        """Get all unique muscles (both target and secondary), sorted."""
+        return self._all_muscles 
\ No newline at end of file
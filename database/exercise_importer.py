@@ -2,12 +2,28 @@
 Module for importing and merging exercise data from various sources.
 """
 
+import itertools
 import json
 import logging
 import os
+import sys
 from typing import List, Dict, Any
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util import Retry
+
+try:
+    import orjson
+except ImportError:
+    # Optional SIMD-accelerated parser; stdlib json covers its absence
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    # Optional incremental parser; without it we fall back to one-shot parsing
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +38,16 @@ class ExerciseImporter:
             output_file (str): Path to save the merged exercise database.
         """
         self.output_file = output_file
-        
+        # Pooled session: keep-alive skips a TCP+TLS handshake per source
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
     def fetch_dataset(self, url: str) -> List[Dict[str, Any]]:
         """
         Fetch exercise data from a given URL.
@@ -37,8 +62,15 @@ class ExerciseImporter:
             RequestException: If there's an error fetching the data.
         """
         try:
-            response = requests.get(url)
+            response = self._session.get(url, timeout=30, stream=True)
             response.raise_for_status()
+            if ijson is not None:
+                # Parse straight off the socket: peak memory is the parsed
+                # records alone, never the full undecoded body alongside them
+                response.raw.decode_content = True
+                return list(ijson.items(response.raw, 'item'))
+            if orjson is not None:
+                return orjson.loads(response.content)
             return response.json()
         except RequestException as e:
             logger.error(f"Error fetching data from {url}: {str(e)}")
@@ -54,24 +86,38 @@ class ExerciseImporter:
         Returns:
             Dict[str, Any]: Standardized exercise data.
         """
-        # Create a standardized exercise object with required fields
+        # Cheap presence check first: if a required field is missing there
+        # is no point lowercasing the other six (sparse rows are common
+        # in the raw feeds). Whitespace-only values still fall through to
+        # the post-strip guard below.
+        if not (exercise.get("name") and exercise.get("bodyPart") and exercise.get("target")):
+            return None
+
+        # Intern the low-cardinality tag fields: across thousands of rows
+        # they repeat a couple dozen values, so duplicates share one object
+        intern = sys.intern
         standardized = {
             "name": exercise.get("name", "").strip(),
             "description": exercise.get("description", "").strip(),
-            "type": exercise.get("type", "weight_reps"),  # Default to weight_reps
-            "body_part": exercise.get("bodyPart", "").strip().lower(),
-            "equipment": exercise.get("equipment", "").strip().lower(),
-            "target_muscle": exercise.get("target", "").strip().lower(),
-            "secondary_muscles": [m.strip().lower() for m in exercise.get("secondaryMuscles", [])],
+            "type": intern(exercise.get("type", "weight_reps")),  # Default to weight_reps
+            "body_part": intern(exercise.get("bodyPart", "").strip().lower()),
+            "equipment": intern(exercise.get("equipment", "").strip().lower()),
+            "target_muscle": intern(exercise.get("target", "").strip().lower()),
+            "secondary_muscles": [intern(m.strip().lower()) for m in exercise.get("secondaryMuscles", [])],
             "instructions": exercise.get("instructions", []),
-            "difficulty": exercise.get("difficulty", "intermediate"),
-            "source": exercise.get("source", "unknown")
+            "difficulty": intern(exercise.get("difficulty", "intermediate")),
+            "source": intern(exercise.get("source", "unknown"))
         }
         
         # Only include exercises with required fields
         if not all([standardized["name"], standardized["body_part"], standardized["target_muscle"]]):
             return None
-            
+
+        # Precompute the dedup key and description length once here so the
+        # merge loop does int compares instead of re-lowercasing per rivalry
+        standardized["_key"] = standardized["name"].lower()
+        standardized["_desc_len"] = len(standardized["description"])
+
         return standardized
         
     def merge_exercises(self, exercise_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
@@ -85,33 +131,50 @@ class ExerciseImporter:
             List[Dict[str, Any]]: Merged and deduplicated list of exercises.
         """
         merged = {}
+
+        for exercise in itertools.chain.from_iterable(exercise_lists):
+            standardized = self.standardize_exercise(exercise)
+            if standardized:
+                # Use precomputed lowercase name as key for deduplication
+                key = standardized["_key"]
+                existing = merged.get(key)
+                if existing is None:
+                    merged[key] = standardized
+                elif standardized["_desc_len"] > existing["_desc_len"]:
+                    # If exercise exists, keep the more complete data
+                    merged[key] = standardized
+
+        # Strip the merge-only bookkeeping fields from the final records
+        return [
+            {k: v for k, v in exercise.items() if not k.startswith("_")}
+            for exercise in merged.values()
+        ]
         
-        for exercises in exercise_lists:
-            for exercise in exercises:
-                standardized = self.standardize_exercise(exercise)
-                if standardized:
-                    # Use exercise name as key for deduplication
-                    key = standardized["name"].lower()
-                    if key not in merged:
-                        merged[key] = standardized
-                    else:
-                        # If exercise exists, update with more complete data
-                        existing = merged[key]
-                        if len(str(standardized["description"])) > len(str(existing["description"])):
-                            merged[key] = standardized
-                            
-        return list(merged.values())
-        
-    def save_to_file(self, exercises: List[Dict[str, Any]]) -> None:
+    def save_to_file(self, exercises: List[Dict[str, Any]], pretty: bool = False) -> None:
         """
         Save the merged exercise database to a JSON file.
-        
+
         Args:
             exercises (List[Dict[str, Any]]): List of exercises to save.
+            pretty (bool): Indent the output for human reading. The file
+                is machine-consumed, so the default is compact — indenting
+                inflates it ~1.5x and slows every subsequent load.
         """
         try:
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                json.dump(exercises, f, indent=2, ensure_ascii=False)
+            # Serialize one record at a time so peak memory during the write
+            # is a single exercise, not the whole database twice over
+            with open(self.output_file, 'wb') as f:
+                f.write(b'[\n')
+                for i, exercise in enumerate(exercises):
+                    if i:
+                        f.write(b',\n')
+                    if orjson is not None:
+                        option = orjson.OPT_INDENT_2 if pretty else 0
+                        f.write(orjson.dumps(exercise, option=option))
+                    else:
+                        indent = 2 if pretty else None
+                        f.write(json.dumps(exercise, indent=indent, ensure_ascii=False).encode('utf-8'))
+                f.write(b'\n]\n')
             logger.info(f"Successfully saved {len(exercises)} exercises to {self.output_file}")
         except IOError as e:
             logger.error(f"Error saving exercises to file: {str(e)}")
@@ -4,6 +4,7 @@ Script to import exercise data from multiple sources and create a unified databa
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from exercise_importer import ExerciseImporter
 
 # Configure logging
@@ -29,16 +30,22 @@ def main():
         # Initialize importer
         importer = ExerciseImporter(output_file=output_file)
         
-        # Fetch exercises from all sources
+        # Fetch all sources concurrently - each request is network-bound,
+        # so total time is the slowest source rather than the sum
         exercise_lists = []
-        for source_name, url in SOURCES.items():
-            logger.info(f"Fetching exercises from {source_name}")
-            exercises = importer.fetch_dataset(url)
-            if exercises:
-                logger.info(f"Successfully fetched {len(exercises)} exercises from {source_name}")
-                exercise_lists.append(exercises)
-            else:
-                logger.warning(f"No exercises fetched from {source_name}")
+        with ThreadPoolExecutor(max_workers=len(SOURCES)) as executor:
+            futures = {
+                executor.submit(importer.fetch_dataset, url): source_name
+                for source_name, url in SOURCES.items()
+            }
+            for future in as_completed(futures):
+                source_name = futures[future]
+                exercises = future.result()
+                if exercises:
+                    logger.info(f"Successfully fetched {len(exercises)} exercises from {source_name}")
+                    exercise_lists.append(exercises)
+                else:
+                    logger.warning(f"No exercises fetched from {source_name}")
         
         if not exercise_lists:
             logger.error("No exercises fetched from any source")
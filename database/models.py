@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Text, ForeignKey, Boolean
-from sqlalchemy.orm import declarative_base, relationship
-from datetime import datetime
+from sqlalchemy import Column, Index, Integer, String, Float, Date, Text, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy.orm import declarative_base, deferred, relationship
+from datetime import date
 
 Base = declarative_base()
 
@@ -18,7 +18,7 @@ class UserProfile(Base):
     diet_type = Column(String)
     allergies = Column(Text)
     fav_foods = Column(Text)
-    created_date = Column(Date, default=datetime.now().date())
+    created_date = Column(Date, default=date.today)
 
     journals = relationship("Journal", back_populates="user")
     plans = relationship("Plan", back_populates="user")
@@ -46,9 +46,17 @@ class Plan(Base):
     activity_level = Column(String)
     training_style = Column(String)
     diet_type = Column(String)
-    plan = Column(Text)
-    created_date = Column(Date, default=datetime.now().date())
-    
+    # The markdown body dwarfs every other column; defer it so queries
+    # that only need metadata don't drag kilobytes of text per row.
+    # Readers that render the body opt back in with undefer(Plan.plan).
+    plan = deferred(Column(Text))
+    created_date = Column(Date, default=date.today)
+
+    # Plans are always fetched per user, newest first
+    __table_args__ = (
+        Index('ix_plans_name_created', 'name', created_date.desc(), id.desc()),
+    )
+
     user = relationship("UserProfile")
 
 class Journal(Base):
@@ -63,5 +71,14 @@ class Journal(Base):
     workout_adherence = Column(Integer)
     diet_adherence = Column(Integer)
     notes = Column(Text)
-    
+
+    # Journal queries filter by name and range/sort on entry_date, so a
+    # composite index turns them into range scans instead of table scans.
+    # The unique constraint is the conflict target for the journal-page
+    # upsert: one entry per user per date.
+    __table_args__ = (
+        UniqueConstraint('name', 'entry_date', name='uq_journal_name_date'),
+        Index('ix_journal_name_date', 'name', entry_date.desc()),
+    )
+
     user = relationship("UserProfile")
@@ -4,24 +4,62 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_week_count(_plan_service: PlanService, username: str, version: int):
+    """Cache the user's latest week number — a scalar COUNT, not a list.
+
+    The version argument is bumped by mark_plan_dirty whenever a plan is
+    saved, so new plans appear immediately.
+    """
+    return _plan_service.get_latest_week_number(username)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_plan(_plan_service: PlanService, username: str, week: int, version: int):
+    """Cache a single week's plan.
+
+    Only the selected week's row ever leaves the database, and weeks the
+    user already visited stay warm in the cache, so navigating back to
+    them is DB-free.
+    """
+    return _plan_service.get_plan_by_week(username, week)
+
+def _set_week(week: int):
+    """on_click callback for week navigation.
+
+    Callbacks run just before the rerun a click triggers anyway, so
+    navigation costs one fragment pass instead of the
+    mutate-then-st.rerun() double execution. The selectbox's own widget
+    state is updated too so it doesn't revert the change on rerender.
+    """
+    st.session_state.history_week = week
+    st.session_state.week_selector = week
+
 def display_history_page(username: str, plan_service: PlanService):
     """Display all previous fitness plans for the user"""
     st.subheader("📚 Plan History")
-    
-    # Get all plans for this user
-    all_plans = plan_service.get_all_user_plans(username)
-    
-    if not all_plans:
+
+    # One scalar query tells us how many weeks exist; plan bodies are
+    # only fetched per selected week inside the fragment below
+    current_week = _cached_week_count(plan_service, username, st.session_state.get("plans_version", 0))
+
+    if not current_week:
         st.info("You haven't generated any fitness plans yet. Go to the Home page to create your first plan!")
         return
-    
-    # Get current week number
-    current_week = max([plan.week_number for plan in all_plans])
-    
+
     # Initialize session state for history_week if not present
     if 'history_week' not in st.session_state:
         st.session_state.history_week = current_week
-    
+
+    _week_view(plan_service, username, current_week)
+
+@st.fragment
+def _week_view(plan_service: PlanService, username: str, current_week: int):
+    """Week selector plus the selected plan's details.
+
+    Runs as a fragment so week navigation reruns only this block —
+    profile, status and the plan list above are not re-executed on
+    every selectbox change or prev/next click.
+    """
     # Add a dropdown in the main area for week selection
     col1, col2 = st.columns([1, 3])
     
@@ -40,10 +78,12 @@ def display_history_page(username: str, plan_service: PlanService):
         # Update session state if dropdown changed
         if selected_week != st.session_state.history_week:
             st.session_state.history_week = selected_week
-            st.rerun()
+            st.rerun(scope="fragment")
     
-    # Find the selected plan
-    selected_plan = next((plan for plan in all_plans if plan.week_number == st.session_state.history_week), None)
+    # Fetch just the selected week's plan
+    selected_plan = _cached_plan(
+        plan_service, username, st.session_state.history_week,
+        st.session_state.get("plans_version", 0))
     
     if selected_plan:
         # Display plan header with week number and creation date
@@ -78,20 +118,27 @@ def display_history_page(username: str, plan_service: PlanService):
         
         # Previous week button
         if st.session_state.history_week > 1:
-            if cols[0].button("← Previous Week", use_container_width=True):
-                st.session_state.history_week -= 1
-                st.rerun()
-                
+            cols[0].button("← Previous Week", use_container_width=True,
+                           on_click=_set_week,
+                           args=(st.session_state.history_week - 1,))
+
         # Current week button (latest)
         if st.session_state.history_week != current_week:
-            if cols[1].button("Latest Plan", use_container_width=True):
-                st.session_state.history_week = current_week
-                st.rerun()
-                
+            cols[1].button("Latest Plan", use_container_width=True,
+                           on_click=_set_week, args=(current_week,))
+
         # Next week button
         if st.session_state.history_week < current_week:
-            if cols[2].button("Next Week →", use_container_width=True):
-                st.session_state.history_week += 1
-                st.rerun()
+            cols[2].button("Next Week →", use_container_width=True,
+                           on_click=_set_week,
+                           args=(st.session_state.history_week + 1,))
+
+        # Warm the adjacent weeks after the selected one has rendered,
+        # so Previous/Next clicks hit the cache instead of a cold fetch
+        version = st.session_state.get("plans_version", 0)
+        if st.session_state.history_week > 1:
+            _cached_plan(plan_service, username, st.session_state.history_week - 1, version)
+        if st.session_state.history_week < current_week:
+            _cached_plan(plan_service, username, st.session_state.history_week + 1, version)
     else:
         st.error("Could not find the selected plan. Please try again.") 
\ No newline at end of file
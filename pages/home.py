@@ -4,19 +4,96 @@ from services.plan_service import PlanService
 from services.ai_service_alt import AIService
 from services.user_service import UserService
 from utils.display import display_success_message, display_info_message, display_error_message
+from utils.session_cache import (
+    get_cached_user_profile,
+    mark_plan_dirty,
+    mark_user_dirty,
+)
+from utils.validators import validate_meal_plan
 import logging
 
 logger = logging.getLogger(__name__)
 
-def display_home_page(name: str, plan_service: PlanService, ai_service: AIService):
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_generation_context(_plan_service: PlanService, username: str, version: int):
+    """Cache the journal check + AI prompt context for the next-week path.
+
+    Keyed on plans_version, which mark_plan_dirty bumps on every plan or
+    journal save, so the context refreshes the moment it can change.
+    """
+    return _plan_service.get_plan_generation_context(username)
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _cached_home_context(_plan_service: PlanService, username: str,
+                         plans_version: int, user_version: int):
+    """Cache the status + latest-plan read behind the home render.
+
+    Keyed on both version counters: plan saves bump plans_version and
+    status writes bump user_version, so a fresh context follows every
+    write while ordinary reruns stay DB-free.
+    """
+    return _plan_service.get_home_context(username)
+
+def _generate_and_save_first_plan(name, profile, plan_service, ai_service,
+                                  user_service, success_message):
+    """Generate, save and announce a from-scratch plan.
+
+    Shared by the first-plan and no-plan-found branches, which used to
+    duplicate this whole block.
+    """
+    saved = False
+    with st.spinner("Creating your personalized plan..."):
+        try:
+            user_data = user_service.create_user_data_dict(profile)
+            output = ai_service.generate_first_plan(user_data)
+            if output:
+                plan_service.save_plan(name, output)
+                mark_plan_dirty(name)
+                user_service.update_user_status(name, first_plan_generated=True, current_week=1)
+                mark_user_dirty()
+
+                # Clear the generate_plan flag to prevent auto-regeneration
+                if 'generate_plan' in st.session_state:
+                    st.session_state.generate_plan = False
+
+                saved = True
+            else:
+                st.error("Failed to generate a valid fitness plan. This could be due to issues with dietary restrictions or exercise requirements.")
+                st.warning("Please try again or modify your dietary restrictions in your profile.")
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Error generating plan: {error_msg}")
+            display_error_message(f"Error generating plan: {error_msg}")
+            if "quota" in error_msg.lower():
+                st.warning("API quota exceeded. Please try again later.")
+            elif "api" in error_msg.lower():
+                st.warning("API connection issue. Please check your internet connection.")
+            else:
+                st.warning("Please try again. If the problem persists, contact support.")
+
+    if saved:
+        # Rerun (outside the try, so the RerunException isn't swallowed)
+        # so the saved plan renders once through the steady-state path
+        st.session_state.plan_saved_message = success_message
+        st.rerun()
+
+def display_home_page(name: str, plan_service: PlanService, ai_service: AIService,
+                      user_service: UserService):
     """Display the home page with user's current plan and options"""
     st.subheader("🏠 Home")
-    
-    # Get user status and profile
-    user_service = UserService()
-    status = user_service.get_user_status(name)
-    profile = user_service.get_user_profile(name)
-    
+
+    # Success message deferred across the rerun that follows a plan save
+    saved_message = st.session_state.pop("plan_saved_message", None)
+    if saved_message:
+        display_success_message(saved_message)
+
+    # One cached read covers status fields and the latest plan
+    context = _cached_home_context(
+        plan_service, name,
+        st.session_state.get("plans_version", 0),
+        st.session_state.get("user_version", 0))
+    profile = get_cached_user_profile(name)
+
     # Check if profile is complete
     if not profile or not profile.get('goal') or not profile.get('gender'):
         st.warning("Please complete your profile before generating a fitness plan.")
@@ -24,41 +101,17 @@ def display_home_page(name: str, plan_service: PlanService, ai_service: AIServic
             st.session_state.nav = "profile"
             st.rerun()
         return
-    
-    if not status or not status['first_plan_generated']:
+
+    if not context.first_plan_generated:
         st.info("🎯 Let's create your first fitness plan!")
         if st.button("Generate My First Plan") or st.session_state.get('generate_plan', False):
-            with st.spinner("Creating your personalized plan..."):
-                try:
-                    user_data = user_service.create_user_data_dict(profile)
-                    output = ai_service.generate_first_plan(user_data)
-                    if output:
-                        plan_service.save_plan(name, output)
-                        user_service.update_user_status(name, first_plan_generated=True, current_week=1)
-                        display_success_message("✅ Your first plan is ready!")
-                        st.markdown(output)
-                        
-                        # Clear the generate_plan flag to prevent auto-regeneration
-                        if 'generate_plan' in st.session_state:
-                            st.session_state.generate_plan = False
-                    else:
-                        st.error("Failed to generate a valid fitness plan. This could be due to issues with dietary restrictions or exercise requirements.")
-                        st.warning("Please try again or modify your dietary restrictions in your profile.")
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Error generating plan: {error_msg}")
-                    st.error(f"Error generating plan: {error_msg}")
-                    if "quota" in error_msg.lower():
-                        st.warning("API quota exceeded. Please try again later.")
-                    elif "api" in error_msg.lower():
-                        st.warning("API connection issue. Please check your internet connection.")
-                    else:
-                        st.warning("Please try again. If the problem persists, contact support.")
+            _generate_and_save_first_plan(name, profile, plan_service, ai_service,
+                                          user_service, "✅ Your first plan is ready!")
     else:
         # Show current plan and option to generate next week
-        current_week = status['current_week']
-        last_plan = plan_service.get_latest_plan(name)
-        
+        current_week = context.current_week
+        last_plan = context.latest_plan
+
         if last_plan:
             try:
                 st.subheader(f"Week {current_week} Plan")
@@ -70,34 +123,58 @@ def display_home_page(name: str, plan_service: PlanService, ai_service: AIServic
                 else:
                     st.error("The plan content appears to be empty.")
                 
-                # Check if journal entry exists for current week
-                if plan_service.has_journal_for_week(name, current_week):
+                # One call covers the journal check and, when it passes,
+                # the previous plans and journal summary for the prompt
+                gen_context = _cached_generation_context(
+                    plan_service, name, st.session_state.get("plans_version", 0))
+                if gen_context.has_journal:
                     if st.button("Generate Next Week's Plan"):
-                        with st.spinner("Updating your plan based on your progress..."):
-                            try:
-                                user_data = user_service.create_user_data_dict(profile)
-                                previous_plans = plan_service.get_previous_plans(name)
-                                # Get journal summary to include in the plan generation
-                                journal_summary = plan_service.get_journal_summary(name, weeks=1)
-                                output = ai_service.generate_fitness_plan(
-                                    user_data, 
-                                    previous_plans,
-                                    journal_summary=journal_summary
-                                )
+                        try:
+                            user_data = user_service.create_user_data_dict(profile)
+                            # Stream tokens into a placeholder as they arrive
+                            # so the user sees the plan building instead of a
+                            # spinner, but the text can be cleared again if
+                            # the assembled plan fails validation
+                            stream_slot = st.empty()
+                            with stream_slot.container():
+                                output = st.write_stream(ai_service.generate_plan_stream(
+                                    user_data,
+                                    gen_context.previous_plans,
+                                    journal_summary=gen_context.journal_summary
+                                ))
+                            # Streaming bypasses the service-side retry loop,
+                            # so validate the assembled text here
+                            meal_violations = validate_meal_plan(output, user_data) if output else ["empty plan"]
+                            if meal_violations:
+                                # Never leave unvalidated content on screen;
+                                # retry through the non-streaming path, which
+                                # feeds violations back to the model for up
+                                # to three attempts
+                                logger.warning(f"Streamed plan failed validation: {meal_violations}")
+                                stream_slot.empty()
+                                with st.spinner("Refining your plan..."):
+                                    output = ai_service.generate_fitness_plan(
+                                        user_data,
+                                        gen_context.previous_plans,
+                                        journal_summary=gen_context.journal_summary
+                                    )
                                 if output:
-                                    plan_service.save_plan(name, output)
-                                    user_service.update_user_status(name, current_week=current_week + 1)
-                                    display_success_message("✅ Your new plan is ready!")
-                                    st.markdown(output)
-                                else:
-                                    st.error("Failed to generate a valid fitness plan. This could be due to issues with dietary restrictions or exercise requirements.")
-                                    st.warning("Please try again or modify your dietary restrictions in your profile.")
-                            except Exception as e:
-                                error_msg = str(e)
-                                logger.error(f"Error generating updated plan: {error_msg}")
-                                display_error_message(f"Error generating plan: {error_msg}")
-                                if "quota" in error_msg.lower():
-                                    st.warning("API quota exceeded. Please try again later.")
+                                    stream_slot.markdown(output)
+                            if output:
+                                plan_service.save_plan(name, output)
+                                mark_plan_dirty(name)
+                                user_service.update_user_status(name, current_week=current_week + 1)
+                                mark_user_dirty()
+                                display_success_message("✅ Your new plan is ready!")
+                            else:
+                                st.error("Failed to generate a valid fitness plan. This could be due to issues with dietary restrictions or exercise requirements.")
+                                st.warning("Please try again or modify your dietary restrictions in your profile.")
+                        except Exception as e:
+                            error_msg = str(e)
+                            logger.error(f"Error generating updated plan: {error_msg}")
+                            display_error_message(f"Error generating plan: {error_msg}")
+                            if "quota" in error_msg.lower():
+                                st.warning("API quota exceeded. Please try again later.")
                 else:
                     display_info_message("📝 Please complete your journal entry for this week before generating a new plan")
                     if st.button("Go to Journal"):
@@ -109,21 +186,5 @@ def display_home_page(name: str, plan_service: PlanService, ai_service: AIServic
         else:
             st.error("No plan found. Please generate a new plan.")
             if st.button("Generate New Plan"):
-                with st.spinner("Creating your personalized plan..."):
-                    try:
-                        user_data = user_service.create_user_data_dict(profile)
-                        output = ai_service.generate_first_plan(user_data)
-                        if output:
-                            plan_service.save_plan(name, output)
-                            user_service.update_user_status(name, first_plan_generated=True, current_week=1)
-                            display_success_message("✅ Your new plan is ready!")
-                            st.markdown(output)
-                        else:
-                            st.error("Failed to generate a valid fitness plan. This could be due to issues with dietary restrictions or exercise requirements.")
-                            st.warning("Please try again or modify your dietary restrictions in your profile.")
-                    except Exception as e:
-                        error_msg = str(e)
-                        logger.error(f"Error generating new plan: {error_msg}")
-                        display_error_message(f"Error generating plan: {error_msg}")
-                        if "quota" in error_msg.lower():
-                            st.warning("API quota exceeded. Please try again later.")
+                _generate_and_save_first_plan(name, profile, plan_service, ai_service,
+                                              user_service, "✅ Your new plan is ready!")
@@ -1,20 +1,82 @@
 import streamlit as st
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from database.connection import db_manager
 from database.models import Journal
 from services.plan_service import PlanService
 from services.user_service import UserService
 from utils.display import display_success_message, display_error_message
+from utils.session_cache import (
+    get_cached_latest_plan,
+    get_cached_user_status,
+    mark_plan_dirty,
+    mark_user_dirty,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-def display_journal_page(username: str, plan_service: PlanService):
+# Entries rendered per history page; render cost and bytes transferred
+# stay O(page size) no matter how long the journal gets
+_PAGE_SIZE = 10
+
+def _load_recent_stats(username: str):
+    """Count of last-week entries and their latest date, in one SELECT."""
+    one_week_ago = datetime.now().date() - timedelta(days=7)
+    with db_manager.session_scope() as session:
+        recent_count, latest_entry_date = session.query(
+            func.count(Journal.id),
+            func.max(Journal.entry_date),
+        ).filter(Journal.name == username, Journal.entry_date >= one_week_ago).one()
+    return (recent_count or 0), latest_entry_date
+
+def _load_journal_data(username: str, page: int):
+    """Load everything the history section needs in one session scope.
+
+    History is paginated with LIMIT/OFFSET so only one page of rows ever
+    leaves the database; the progress insights come from scalar
+    aggregate queries instead of loading every entry into Python.
+    """
+    with db_manager.session_scope() as session:
+        base = session.query(Journal).filter(Journal.name == username)
+
+        # One SELECT returns the totals and averages over the whole journal
+        total, avg_workout, avg_diet = session.query(
+            func.count(Journal.id),
+            func.avg(Journal.workout_adherence),
+            func.avg(Journal.diet_adherence),
+        ).filter(Journal.name == username).one()
+        total = total or 0
+
+        first_weight = base.order_by(Journal.entry_date.asc())\
+            .with_entities(Journal.weight).limit(1).scalar()
+        latest_weight = base.order_by(Journal.entry_date.desc())\
+            .with_entities(Journal.weight).limit(1).scalar()
+
+        entries = base.order_by(Journal.entry_date.desc())\
+            .limit(_PAGE_SIZE)\
+            .offset(page * _PAGE_SIZE)\
+            .all()
+        # Detach so the objects stay readable after the scope closes
+        session.expunge_all()
+
+    return {
+        "entries": entries,
+        "total": total,
+        "avg_workout": avg_workout,
+        "avg_diet": avg_diet,
+        "first_weight": first_weight,
+        "latest_weight": latest_weight,
+    }
+
+def display_journal_page(username: str, plan_service: PlanService,
+                         user_service: UserService):
     """Display the journal page for tracking progress"""
     st.subheader("📓 Weekly Journal")
     
     # Check if user has a plan first
-    latest_plan = plan_service.get_latest_plan(username)
+    latest_plan = get_cached_latest_plan(plan_service, username)
     if not latest_plan:
         st.warning("You need to generate a fitness plan before you can start journaling.")
         if st.button("Go to Home"):
@@ -22,23 +84,16 @@ def display_journal_page(username: str, plan_service: PlanService):
             st.rerun()
         return
     
-    # Get user status to determine current week
-    user_service = UserService()
-    status = user_service.get_user_status(username)
+    # Get user status to determine current week (cached across reruns)
+    status = get_cached_user_status(username)
     current_week = status['current_week'] if status else 1
     
     st.markdown(f"### Week {current_week} Check-In")
     
     # Check for recent entries to avoid duplicates
-    with db_manager.session_scope() as session:
-        one_week_ago = datetime.now().date() - timedelta(days=7)
-        recent_entries = session.query(Journal).filter(
-            Journal.name == username,
-            Journal.entry_date >= one_week_ago
-        ).order_by(Journal.entry_date.desc()).all()
-        
-        if recent_entries:
-            st.info(f"You've made {len(recent_entries)} journal entries in the past week. Latest entry was on {recent_entries[0].entry_date.strftime('%Y-%m-%d')}.")
+    recent_count, latest_entry_date = _load_recent_stats(username)
+    if recent_count:
+        st.info(f"You've made {recent_count} journal entries in the past week. Latest entry was on {latest_entry_date.strftime('%Y-%m-%d')}.")
     
     # Initialize entry date and current week status
     entry_date = datetime.now().date()
@@ -92,37 +147,42 @@ def display_journal_page(username: str, plan_service: PlanService):
     if submitted:
         try:
             with db_manager.session_scope() as session:
-                # Check if entry for this date already exists
-                existing_entry = session.query(Journal).filter_by(
-                    name=username, entry_date=entry_date).first()
-                
-                if existing_entry:
-                    # Update existing entry
-                    existing_entry.weight = weight
-                    existing_entry.mood = mood
-                    existing_entry.energy = energy
-                    existing_entry.workout_adherence = workout_adherence
-                    existing_entry.diet_adherence = diet_adherence
-                    existing_entry.notes = notes
-                    message = "Journal entry updated successfully!"
-                else:
-                    # Create new entry
-                    new_entry = Journal(
-                        name=username,
-                        entry_date=entry_date,
-                        weight=weight,
-                        mood=mood,
-                        energy=energy,
-                        workout_adherence=workout_adherence,
-                        diet_adherence=diet_adherence,
-                        notes=notes
-                    )
-                    session.add(new_entry)
-                    message = "New journal entry saved successfully!"
-                
-                # Update last_journal_date in user status
-                user_service.update_user_status(username, last_journal_date=entry_date)
-            
+                # One upsert replaces the old SELECT-then-UPDATE/INSERT
+                # pair: a single round-trip, and no race window between
+                # the existence check and the write
+                stmt = sqlite_insert(Journal).values(
+                    name=username,
+                    entry_date=entry_date,
+                    weight=weight,
+                    mood=mood,
+                    energy=energy,
+                    workout_adherence=workout_adherence,
+                    diet_adherence=diet_adherence,
+                    notes=notes
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['name', 'entry_date'],
+                    set_={
+                        'weight': stmt.excluded.weight,
+                        'mood': stmt.excluded.mood,
+                        'energy': stmt.excluded.energy,
+                        'workout_adherence': stmt.excluded.workout_adherence,
+                        'diet_adherence': stmt.excluded.diet_adherence,
+                        'notes': stmt.excluded.notes,
+                    }
+                )
+                session.execute(stmt)
+                message = "Journal entry saved successfully!"
+
+                # Same session: the entry and the status update commit
+                # together — one transaction (one fsync) instead of two
+                user_service.update_user_status(
+                    username, session=session, last_journal_date=entry_date)
+
+            # New journal data feeds the next plan; drop the cached one
+            mark_plan_dirty(username)
+            mark_user_dirty()
+
             display_success_message(message)
             
             # Determine if entry is for current week
@@ -137,49 +197,69 @@ def display_journal_page(username: str, plan_service: PlanService):
             display_error_message(f"Error saving journal entry: {str(e)}")
     
     # Generate New Plan button OUTSIDE the form
-    if is_current_week and (submitted or recent_entries):
+    if is_current_week and (submitted or recent_count):
         if st.button("Generate New Plan", key="generate_new_plan_button"):
             st.session_state.nav = "home"
             st.session_state.generate_plan = True
             st.rerun()
     
     # Display journal history if available
+    _history_section(username)
+
+@st.fragment
+def _history_section(username: str):
+    """Journal history: insights plus one paginated page of entries.
+
+    Runs as a fragment so flipping between history pages reruns (and
+    re-queries) only this block instead of the whole journal page,
+    including the check-in form above it.
+    """
     st.markdown("### Journal History")
-    
-    with db_manager.session_scope() as session:
-        entries = session.query(Journal).filter_by(name=username).order_by(Journal.entry_date.desc()).all()
-        
-        if entries:
-            # Create a container to show progress insights
-            with st.expander("Progress Insights", expanded=True):
-                if len(entries) >= 2:
-                    first_weight = entries[-1].weight
-                    latest_weight = entries[0].weight
-                    weight_change = latest_weight - first_weight
-                    
-                    st.write(f"Starting weight: {first_weight} kg")
-                    st.write(f"Current weight: {latest_weight} kg")
-                    st.write(f"Total change: {weight_change:.1f} kg")
-                    
-                    # Calculate average adherence
-                    avg_workout = sum([e.workout_adherence for e in entries]) / len(entries)
-                    avg_diet = sum([e.diet_adherence for e in entries]) / len(entries)
-                    st.write(f"Average workout adherence: {avg_workout:.1f}%")
-                    st.write(f"Average diet adherence: {avg_diet:.1f}%")
-                else:
-                    st.info("Add more journal entries to see progress insights.")
-            
-            # Show individual entries
-            for entry in entries:
-                with st.expander(f"Entry: {entry.entry_date.strftime('%Y-%m-%d')}"):
-                    st.write(f"Weight: {entry.weight} kg")
-                    st.write(f"Mood: {entry.mood}")
-                    st.write(f"Energy: {entry.energy}")
-                    st.write(f"Workout Adherence: {entry.workout_adherence}%")
-                    st.write(f"Diet Adherence: {entry.diet_adherence}%")
-                    st.write(f"Notes: {entry.notes}")
-        else:
-            st.info("No journal entries found. Start tracking your progress by adding your first entry.")
+
+    page = st.session_state.get("journal_page", 0)
+    data = _load_journal_data(username, page)
+
+    if data["total"]:
+        # Insights come from SQL aggregates over the whole journal, so
+        # they stay accurate even though only one page of rows is loaded
+        with st.expander("Progress Insights", expanded=True):
+            if data["total"] >= 2:
+                weight_change = data["latest_weight"] - data["first_weight"]
+
+                st.write(f"Starting weight: {data['first_weight']} kg")
+                st.write(f"Current weight: {data['latest_weight']} kg")
+                st.write(f"Total change: {weight_change:.1f} kg")
+
+                st.write(f"Average workout adherence: {data['avg_workout']:.1f}%")
+                st.write(f"Average diet adherence: {data['avg_diet']:.1f}%")
+            else:
+                st.info("Add more journal entries to see progress insights.")
+
+        # Render only the current page of entries
+        total_pages = (data["total"] + _PAGE_SIZE - 1) // _PAGE_SIZE
+        if total_pages > 1:
+            st.caption(f"Page {page + 1} of {total_pages} ({data['total']} entries)")
+        for entry in data["entries"]:
+            with st.expander(f"Entry: {entry.entry_date.strftime('%Y-%m-%d')}"):
+                st.write(f"Weight: {entry.weight} kg")
+                st.write(f"Mood: {entry.mood}")
+                st.write(f"Energy: {entry.energy}")
+                st.write(f"Workout Adherence: {entry.workout_adherence}%")
+                st.write(f"Diet Adherence: {entry.diet_adherence}%")
+                st.write(f"Notes: {entry.notes}")
+
+        if total_pages > 1:
+            cols = st.columns(2)
+            if page > 0:
+                if cols[0].button("← Newer entries", use_container_width=True):
+                    st.session_state.journal_page = page - 1
+                    st.rerun(scope="fragment")
+            if page + 1 < total_pages:
+                if cols[1].button("Older entries →", use_container_width=True):
+                    st.session_state.journal_page = page + 1
+                    st.rerun(scope="fragment")
+    else:
+        st.info("No journal entries found. Start tracking your progress by adding your first entry.")
 
 def calculate_week_number(start_date, current_date):
     """Calculate the week number based on the start date and current date"""
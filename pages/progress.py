@@ -1,7 +1,6 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from database.connection import db_manager
 from database.models import Journal, Plan
@@ -9,144 +8,217 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def display_progress_page(username: str):
-    """Display the progress page with user data visualizations"""
-    st.subheader("📊 Progress Tracking")
-    
-    # Check if user has sufficient data for visualization
+# Ordered categorical scales for the wellbeing chart: category position
+# + 1 gives the 1-5 score, converted at C level instead of a per-row
+# Python dict lookup
+_MOOD_CAT = pd.CategoricalDtype(
+    ['Terrible', 'Poor', 'Average', 'Good', 'Excellent'], ordered=True)
+_ENERGY_CAT = pd.CategoricalDtype(
+    ['Very Low', 'Low', 'Average', 'High', 'Very High'], ordered=True)
+
+@st.cache_data(show_spinner=False)
+def _plan_body(plan_id: int):
+    """Fetch one plan's markdown body.
+
+    Saved plans are never edited, so the cache needs no TTL — each body
+    is read from the database at most once per process.
+    """
     with db_manager.session_scope() as session:
-        journal_entries = session.query(Journal).filter_by(name=username).all()
-        plans = session.query(Plan).filter_by(name=username).all()
-        
-        if not journal_entries:
-            st.warning("No journal entries found. Please log some entries to track your progress.")
-            if st.button("Go to Journal"):
-                st.session_state.nav = "journal"
-                st.rerun()
-            return
-    
-    # Convert journal entries to dataframe for visualization
-    data = []
-    for entry in journal_entries:
-        data.append({
-            'date': entry.entry_date,
-            'weight': entry.weight,
-            'workout_adherence': entry.workout_adherence,
-            'diet_adherence': entry.diet_adherence,
-            'mood': entry.mood,
-            'energy': entry.energy
-        })
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values(by='date')
-    
-    # Weight tracking chart
-    st.markdown("### Weight Progress")
-    
-    # Create weight chart with trendline
-    fig_weight = px.line(df, x='date', y='weight', markers=True, title='Weight Over Time (kg)')
-    fig_weight.update_layout(xaxis_title='Date', yaxis_title='Weight (kg)')
-    
-    # Add trendline if enough data points
+        return session.query(Plan.plan).filter(Plan.id == plan_id).scalar()
+
+@st.fragment
+def _plan_history(plans):
+    """Plan picker plus the selected plan's details.
+
+    Only the selected plan's body is fetched; switching plans reruns
+    just this fragment.
+    """
+    labels = [
+        f"Plan {i + 1} - Created on {plan['created_date'].strftime('%Y-%m-%d')}"
+        for i, plan in enumerate(plans)
+    ]
+    choice = st.selectbox("Select a plan", labels, index=len(labels) - 1)
+    plan = plans[labels.index(choice)]
+
+    st.markdown(
+        f"Goal: {plan['goal']}\n\n"
+        f"Weight at time of plan: {plan['weight']} kg\n\n"
+        f"**Plan Details:**\n\n"
+        f"{_plan_body(plan['id'])}"
+    )
+
+def _rolling_mean3(values):
+    """Trailing 3-point mean via cumsum.
+
+    Matches rolling(window=3, min_periods=1): the first two points
+    average what exists so far. A cumsum and one vector subtraction
+    replace pandas' rolling-window machinery for this tiny fixed
+    window.
+    """
+    c = np.cumsum(values)
+    trend = np.empty_like(c, dtype=np.float64)
+    trend[0] = c[0]
+    trend[1] = c[1] / 2.0
+    trend[2:] = (c[2:] - np.concatenate(((0.0,), c[:-3]))) / 3.0
+    return trend
+
+@st.cache_data(ttl=120, show_spinner=False)
+def _load_progress_data(username: str, version: int):
+    """Load journal entries as a DataFrame and plans as plain dicts.
+
+    Cached so tab switches and widget clicks don't re-run the queries
+    or rebuild the DataFrame on every rerun. Keyed on plans_version,
+    which journal and plan saves bump, so fresh data follows every
+    write. Plans come back as dicts because cached values are pickled
+    between reruns and ORM instances don't travel well.
+    """
+    with db_manager.session_scope() as session:
+        # Select just the charted columns as tuples — no ORM instances
+        # or per-row dicts to build for the DataFrame
+        rows = session.query(
+            Journal.entry_date, Journal.weight, Journal.workout_adherence,
+            Journal.diet_adherence, Journal.mood, Journal.energy)\
+            .filter_by(name=username)\
+            .order_by(Journal.entry_date)\
+            .all()
+        # Metadata only — plan bodies stay deferred and are fetched one
+        # at a time when the user actually picks a plan below
+        plan_rows = session.query(
+            Plan.id, Plan.created_date, Plan.goal, Plan.weight)\
+            .filter_by(name=username)\
+            .all()
+        plan_dicts = [{
+            'id': row.id,
+            'created_date': row.created_date,
+            'goal': row.goal,
+            'weight': row.weight
+        } for row in plan_rows]
+
+    if not rows:
+        return None, plan_dicts
+
+    # Row tuples feed the DataFrame directly
+    df = pd.DataFrame.from_records(
+        rows,
+        columns=['date', 'weight', 'workout_adherence', 'diet_adherence',
+                 'mood', 'energy'])
+
+    # One vectorized conversion to datetime64; otherwise plotly coerces
+    # the Python date objects trace by trace on every figure build
+    df['date'] = pd.to_datetime(df['date'])
+
+    # Score columns ride along in the cache instead of being remapped
+    # on every rerun. Codes are -1 for unknown labels; the mask keeps
+    # the NaN-for-unknown behaviour the old .map lookup had.
+    mood_codes = df['mood'].astype(_MOOD_CAT).cat.codes
+    energy_codes = df['energy'].astype(_ENERGY_CAT).cat.codes
+    df['mood_score'] = (mood_codes + 1).where(mood_codes >= 0)
+    df['energy_score'] = (energy_codes + 1).where(energy_codes >= 0)
+    return df, plan_dicts
+
+def _build_progress_figure(df):
+    """Assemble the three-panel progress figure for a journal DataFrame."""
+    # Imported here so app startup and the other pages don't pay
+    # plotly's import cost; cached by sys.modules after the first visit
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    dates = df['date'].to_numpy()
+
+    fig = make_subplots(
+        rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+        subplot_titles=('Weight Over Time (kg)',
+                        'Weekly Plan Adherence (%)',
+                        'Mood & Energy Levels'))
+
+    # Weight with trendline
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=df['weight'],
+        mode='lines+markers',
+        name='Weight'
+    ), row=1, col=1)
     if len(df) >= 3:
-        fig_weight.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['weight'].rolling(window=3, min_periods=1).mean(),
+        fig.add_trace(go.Scatter(
+            x=dates,
+            y=_rolling_mean3(df['weight'].to_numpy(dtype=np.float64)),
             mode='lines',
             line=dict(color='rgba(0,128,0,0.5)', width=2, dash='dash'),
             name='Trend'
-        ))
-    
-    st.plotly_chart(fig_weight, use_container_width=True)
-    
-    # Adherence tracking
-    st.markdown("### Plan Adherence")
-    
-    # Create adherence chart
-    fig_adherence = go.Figure()
-    fig_adherence.add_trace(go.Bar(
-        x=df['date'],
+        ), row=1, col=1)
+
+    # Adherence bars
+    fig.add_trace(go.Bar(
+        x=dates,
         y=df['workout_adherence'],
         name='Workout Adherence',
         marker_color='blue'
-    ))
-    fig_adherence.add_trace(go.Bar(
-        x=df['date'],
+    ), row=2, col=1)
+    fig.add_trace(go.Bar(
+        x=dates,
         y=df['diet_adherence'],
         name='Diet Adherence',
         marker_color='green'
-    ))
-    
-    fig_adherence.update_layout(
-        title='Weekly Plan Adherence (%)',
-        xaxis_title='Date',
-        yaxis_title='Adherence (%)',
-        barmode='group',
-        yaxis=dict(range=[0, 100])
-    )
-    
-    st.plotly_chart(fig_adherence, use_container_width=True)
-    
-    # Mood and energy tracking
-    st.markdown("### Mood & Energy Tracking")
-    
-    # Convert categorical to numerical for plotting
-    mood_mapping = {
-        'Excellent': 5,
-        'Good': 4,
-        'Average': 3,
-        'Poor': 2,
-        'Terrible': 1
-    }
-    
-    energy_mapping = {
-        'Very High': 5,
-        'High': 4,
-        'Average': 3,
-        'Low': 2,
-        'Very Low': 1
-    }
-    
-    df['mood_score'] = df['mood'].map(mood_mapping)
-    df['energy_score'] = df['energy'].map(energy_mapping)
-    
-    # Create combined mood/energy chart
-    fig_wellbeing = go.Figure()
-    fig_wellbeing.add_trace(go.Scatter(
-        x=df['date'],
+    ), row=2, col=1)
+
+    # Mood and energy lines
+    fig.add_trace(go.Scatter(
+        x=dates,
         y=df['mood_score'],
         mode='lines+markers',
         name='Mood',
         line=dict(color='purple')
-    ))
-    fig_wellbeing.add_trace(go.Scatter(
-        x=df['date'],
+    ), row=3, col=1)
+    fig.add_trace(go.Scatter(
+        x=dates,
         y=df['energy_score'],
         mode='lines+markers',
         name='Energy',
         line=dict(color='orange')
-    ))
-    
-    fig_wellbeing.update_layout(
-        title='Mood & Energy Levels',
-        xaxis_title='Date',
-        yaxis_title='Level',
-        yaxis=dict(
-            tickmode='array',
-            tickvals=[1, 2, 3, 4, 5],
-            ticktext=['Very Low', 'Low', 'Average', 'High', 'Very High'],
-            range=[0.5, 5.5]
-        )
+    ), row=3, col=1)
+
+    fig.update_layout(height=900, barmode='group')
+    fig.update_yaxes(title_text='Weight (kg)', row=1, col=1)
+    fig.update_yaxes(title_text='Adherence (%)', range=[0, 100], row=2, col=1)
+    fig.update_yaxes(
+        title_text='Level',
+        tickmode='array',
+        tickvals=[1, 2, 3, 4, 5],
+        ticktext=['Very Low', 'Low', 'Average', 'High', 'Very High'],
+        range=[0.5, 5.5],
+        row=3, col=1
     )
-    
-    st.plotly_chart(fig_wellbeing, use_container_width=True)
-    
+    fig.update_xaxes(title_text='Date', row=3, col=1)
+
+    return fig
+
+def display_progress_page(username: str):
+    """Display the progress page with user data visualizations"""
+    st.subheader("📊 Progress Tracking")
+
+    df, plans = _load_progress_data(
+        username, st.session_state.get("plans_version", 0))
+
+    if df is None:
+        st.warning("No journal entries found. Please log some entries to track your progress.")
+        if st.button("Go to Journal"):
+            st.session_state.nav = "journal"
+            st.rerun()
+        return
+
+    if len(df) < 2:
+        # One point draws no useful chart; skip plotly (and its lazy
+        # import) entirely until there's something to trend
+        st.info("📈 First entry logged! Charts appear once you have at least two entries to compare.")
+    else:
+        # All three charts share one figure and one date array, so the
+        # browser gets a single render cycle and the x data once
+        # instead of three copies
+        st.markdown("### Progress Charts")
+        st.plotly_chart(_build_progress_figure(df), use_container_width=True)
+
     # Plan history
     st.markdown("### Plan History")
-    
-    for i, plan in enumerate(plans):
-        with st.expander(f"Plan {i+1} - Created on {plan.created_date.strftime('%Y-%m-%d')}"):
-            st.write(f"Goal: {plan.goal}")
-            st.write(f"Weight at time of plan: {plan.weight} kg")
-            st.markdown("**Plan Details:**")
-            st.markdown(plan.plan)
+
+    if plans:
+        _plan_history(plans)
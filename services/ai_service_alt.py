@@ -1,62 +1,408 @@
+import asyncio
 import json
 import logging
+import random
+import re
+import threading
 import requests
-from typing import Optional, Dict, Any, List
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APITimeoutError, APIConnectionError
+from typing import Optional, Dict, Any, Callable, List
 from config.settings import OPENAI_API_KEY
-from config.prompts import FIRST_PLAN_PROMPT, FITNESS_PLAN_PROMPT
+from config.prompts import (
+    FITNESS_PLAN_SYSTEM,
+    MEAL_PLAN_SCHEMA,
+    MOTIVATIONAL_MESSAGE_PROMPT,
+    PROGRESS_SUMMARY_PROMPT,
+    SYSTEM_PROMPT_HEALTH_COACH,
+    render_fitness_plan_user
+)
 from utils.validators import (
     validate_plan_content,
     validate_meal_plan,
     validate_workout_structure
 )
-from database.exercise_db import ExerciseDatabase
+from database.exercise_db import get_exercise_database
+from services.llm_cache import LLMCache
 
 logger = logging.getLogger(__name__)
 
+# Static instruction blocks for the section prompts, hoisted to module
+# constants and placed at the FRONT of each user message with the short
+# per-user profile tail appended last. OpenAI's automatic prompt caching
+# discounts identical prefixes, so the long shared instructions earn the
+# cached-token rate across users while only the tail varies.
+_WORKOUT_SYSTEM_PROMPT = """You are a NASM-certified personal trainer creating a detailed 3-day workout plan.
+REQUIREMENTS:
+1. Each day should have 3-5 exercises
+2. Number each exercise with a colon (e.g. "1. Bench Press:")
+3. Include these bullet points for EVERY exercise:
+   * Sets: (specify number)
+   * Reps: (specify range)
+   * Rest: (in seconds)
+   * Form: (clear instructions)
+4. Match intensity to user's level
+5. Focus on compound movements first
+6. NO placeholder text or [brackets]
+7. Use the format shown in the example below"""
+
+_WORKOUT_EXAMPLE_FORMAT = """Day 1 - Push (Chest, Shoulders, Triceps)
+--------------------------------------
+1. Bench Press:
+   * Sets: 3 sets
+   * Reps: 8-10
+   * Rest: 90s
+   * Weight/Intensity: Moderate (60-70% 1RM)
+   * Form: Lie flat on bench, feet planted. Grip bar slightly wider than shoulders. Lower to chest, press up.
+
+2. Shoulder Press:
+   * Sets: 3 sets
+   * Reps: 8-12
+   * Rest: 60s
+   * Form: Stand or sit with dumbbells at shoulder level, press overhead"""
+
+_WORKOUT_STATIC_PROMPT = """Create a 3-day workout plan.
+
+REQUIREMENTS:
+1. Create 3-5 exercises for each day
+2. Follow the format shown in the example
+3. Include bullet points for Sets, Reps, Rest and Form for every exercise
+4. Number exercises for each day
+
+FOLLOW THIS FORMAT:
+""" + _WORKOUT_EXAMPLE_FORMAT
+
+_MEAL_SYSTEM_PROMPT = (
+    "You are a registered dietitian with specialized training in food allergies and clinical nutrition. "
+    "Your PRIMARY RESPONSIBILITY is ensuring patient safety by strictly following dietary restrictions. "
+    "Lives depend on your ability to COMPLETELY EXCLUDE all allergenic foods. "
+    "NEVER compromise on dietary restrictions for taste, convenience, or nutritional goals."
+)
+
+_MEAL_STATIC_PROMPT = """You are a board-certified dietitian with 10+ years experience in clinical nutrition and sports dietetics.
+
+CREATE A COMPREHENSIVE 7-DAY MEAL PLAN.
+
+CRITICAL ALLERGEN INFORMATION:
+* If "nuts" are mentioned in allergies, NEVER include or mention ANY:
+  - Tree nuts (almonds, walnuts, cashews, pistachios, pecans, hazelnuts)
+  - Peanuts or peanut products
+  - Almond milk, almond flour, nut oils, nut butters
+  - Seeds that could be confused with nuts
+  - Products that may contain nuts (granola, trail mix, some cereals)
+* Use NUT-FREE ALTERNATIVES ONLY:
+  - Instead of almond milk, use oat milk, soy milk, or coconut milk
+  - Instead of nut butter, use sunflower seed butter or tahini
+  - Instead of nuts in recipes, use seeds, beans, or crispy chickpeas
+
+For EACH day (Monday through Sunday), include:
+* Breakfast (with calories)
+* Morning Snack (with calories)
+* Lunch (with calories)
+* Afternoon Snack (with calories)
+* Dinner (with calories)
+* Daily totals for calories and macros
+
+DO NOT include any other sections. ONLY provide the meal plan."""
+
+_FORM_SYSTEM_PROMPT = (
+    "You are a certified fitness instructor creating only the form and technique guide portion of a fitness plan. "
+    "Provide detailed, practical advice on proper exercise execution and safety."
+)
+
+_FORM_STATIC_PROMPT = """Create a detailed form and technique guide for a fitness plan.
+
+Include detailed instructions for common exercises in the client's routine, covering:
+* Starting position
+* Movement execution
+* Breathing pattern
+* Common mistakes
+* Safety considerations
+* Progressive overload tips
+
+DO NOT include any other sections. ONLY provide the form and technique guide."""
+
+_PROGRESS_SYSTEM_PROMPT = (
+    "You are a fitness coach creating only the progress tracking portion of a fitness plan. "
+    "Provide practical, actionable methods for tracking progress toward fitness goals."
+)
+
+_PROGRESS_STATIC_PROMPT = """Create a progress tracking guide for a fitness plan.
+
+Include specific recommendations for:
+* Weekly measurements (what to measure and how)
+* Performance metrics to track
+* Progress photos (how and when to take them)
+* Adherence tracking methods
+* How to adjust the plan based on progress
+
+DO NOT include any other sections. ONLY provide the progress tracking guide."""
+
+# Shared by the blocking and streaming update-plan paths. The full static
+# instruction block (role + requirements) goes in the system message so the
+# provider's prompt caching hits on the unchanging prefix.
+_UPDATE_PLAN_SYSTEM_PROMPT = (
+    "You are an expert fitness coach and nutritionist creating personalized plans. "
+    "Follow these critical guidelines:\n"
+    "1. Format exercises EXACTLY as numbered items (e.g., '1. Bench Press:') with proper details\n"
+    "2. STRICTLY AVOID all foods related to the user's allergies in the meal plan\n"
+    "3. Include exercises for each workout day\n"
+    "4. NEVER use placeholder text or '[repeat format]' instructions\n"
+    "5. Write everything out in complete detail\n"
+    "6. Use prior plans and progress to create appropriate progressions\n"
+) + FITNESS_PLAN_SYSTEM
+
+# Exercises are requested 3-5 per day, so numbering running past 7
+# signals a completion that has lost the format
+_RUNAWAY_EXERCISE_RE = re.compile(r"^\s*(?:[89]|\d{2,})\.\s", re.MULTILINE)
+
+def _workout_stream_ok(buffer: str) -> bool:
+    """Incremental sanity check for a streaming workout completion.
+
+    Returns False to abort the stream: a completion that hasn't opened
+    with Day 1 within the first few hundred characters, or that numbers
+    exercises far past the 3-5 requested per day, will fail the post-hoc
+    validation anyway — cutting the stream stops paying for the rest.
+    """
+    if len(buffer) > 600 and "Day 1" not in buffer:
+        return False
+    if _RUNAWAY_EXERCISE_RE.search(buffer):
+        return False
+    return True
+
+@lru_cache(maxsize=None)
+def _allergen_line_pattern(terms: frozenset) -> "re.Pattern":
+    """Compiled pattern matching any whole line that mentions a term.
+
+    Compiled once per term set and reused across calls. Substring
+    matching (no word boundaries) deliberately mirrors the old
+    `term in line` check — "coconut" still trips a "nut" filter,
+    erring on the side of removal for allergens.
+    """
+    joined = "|".join(map(re.escape, sorted(terms)))
+    return re.compile(r"(?im)^.*(?:" + joined + r").*\n?")
+
 class AIService:
     """Implementation of AIService using direct API calls to OpenAI"""
     
-    def __init__(self):
+    def __init__(self, max_concurrent_requests: int = 10, max_retries: int = 5):
         self.api_key = OPENAI_API_KEY
         self.api_base = "https://api.openai.com/v1"
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
-        self.exercise_db = ExerciseDatabase()
+        # Pooled session for the raw chat/completions path: keep-alive
+        # skips a fresh TCP+TLS handshake to api.openai.com on every
+        # call, and retriable statuses are handled at transport level
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504]
+            )
+        ))
+        self.client = OpenAI(api_key=self.api_key)
+        self.async_client = AsyncOpenAI(api_key=self.api_key)
+        self.max_retries = max_retries
+        # All async work runs on one dedicated loop in a daemon thread.
+        # The service is a process-wide singleton, and asyncio.run per
+        # call would give the shared AsyncOpenAI client a different
+        # (then closed) loop each time — the classic "Event loop is
+        # closed" on reused pooled connections — while two sessions
+        # generating at once would drive it from two loops in parallel.
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True,
+                         name="ai-service-loop").start()
+        # Per-section model routing: the workout section is validation-
+        # gated and keeps the flagship model; the meal section needs a
+        # structured-outputs model (json_schema response_format is
+        # rejected by gpt-4-turbo); the form guide and progress tracker
+        # are generic advice where a small model is ~30x cheaper and
+        # several times faster with no quality gate to fail
+        self.models = {
+            "workout": "gpt-4-turbo",
+            "meal": "gpt-4o-2024-08-06",
+            "form": "gpt-4o-mini",
+            "progress": "gpt-4o-mini"
+        }
+        # Cap in-flight requests so batched section generation stays
+        # under the account's requests-per-minute ceiling
+        self._request_semaphore = asyncio.Semaphore(max_concurrent_requests)
+        # Repeat requests with an identical payload are served from disk
+        # instead of re-billing OpenAI
+        self.cache = LLMCache()
+        self.exercise_db = get_exercise_database()
         logger.info("OpenAI service initialized")
 
     def _call_openai_api(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Make a direct API call to OpenAI using requests"""
         url = f"{self.api_base}/{endpoint}"
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            # (connect, read) timeout: fail fast on an unreachable API
+            # but leave room for long completions
+            response = self.session.post(url, json=payload, timeout=(5, 120))
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"API request failed: {str(e)}")
             raise
 
+    async def _gen_section(self, system_prompt: str, prompt: str, max_tokens: int = 2000,
+                           response_format: Optional[Dict[str, Any]] = None, n: int = 1,
+                           model: str = "gpt-4-turbo",
+                           stream_check: Optional[Callable[[str], bool]] = None,
+                           use_cache: bool = True):
+        """Generate a single plan section via the async OpenAI client
+
+        Completions are cached on disk keyed on the full request payload,
+        so a repeat request for an unchanged profile skips the API
+        entirely. Callers that validate completions before accepting
+        them must pass use_cache=False and cache the accepted content
+        themselves — caching here would persist rejected output and
+        replay it on every retry of the identical payload. Transient
+        failures (rate limits, timeouts, connection errors) are retried
+        with exponential backoff and jitter instead of failing the
+        whole plan generation.
+
+        With n > 1 a single request samples n candidate completions —
+        prompt tokens are billed once — and a list is returned for the
+        caller to validate; with the default n=1 the content string is
+        returned directly.
+
+        With a stream_check (n=1 only) the completion is streamed and
+        the guard runs over the accumulated text as it grows; if it
+        trips, the stream is closed — stopping token billing mid-
+        completion — and None is returned for the caller's retry loop.
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        create_kwargs = {}
+        if response_format is not None:
+            create_kwargs["response_format"] = response_format
+        if n > 1:
+            create_kwargs["n"] = n
+
+        cache_key = self.cache.key({
+            "model": model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            **create_kwargs
+        })
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving completion from LLM cache")
+                return json.loads(cached) if n > 1 else cached
+
+        for attempt in range(self.max_retries):
+            try:
+                async with self._request_semaphore:
+                    if stream_check is not None and n == 1:
+                        content = await self._stream_completion(
+                            model, messages, max_tokens, create_kwargs, stream_check)
+                        if content is None:
+                            # Aborted by the guard — a malformed
+                            # completion, not a transport error, so let
+                            # the caller's validation loop retry it
+                            return None
+                        contents = [content]
+                    else:
+                        response = await self.async_client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=max_tokens,
+                            **create_kwargs
+                        )
+                        contents = [choice.message.content for choice in response.choices]
+                if use_cache:
+                    self.cache.set(cache_key, json.dumps(contents) if n > 1 else contents[0])
+                return contents if n > 1 else contents[0]
+            except (RateLimitError, APITimeoutError, APIConnectionError) as e:
+                if attempt == self.max_retries - 1:
+                    logger.error(f"OpenAI request failed after {self.max_retries} attempts: {str(e)}")
+                    raise
+                delay = min(2 ** attempt + random.uniform(0, 1), 60)
+                logger.warning(f"OpenAI request failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _stream_completion(self, model, messages, max_tokens, create_kwargs,
+                                 stream_check) -> Optional[str]:
+        """Stream one completion, aborting early if the guard trips.
+
+        The guard runs over the accumulated text every few chunks; a
+        structural fault at token ~400 closes the stream instead of
+        paying for the remaining couple of thousand tokens. Returns the
+        full content, or None if the guard aborted.
+        """
+        stream = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            stream=True,
+            **create_kwargs
+        )
+        parts = []
+        unchecked = 0
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            parts.append(delta)
+            unchecked += 1
+            if unchecked >= 20:
+                unchecked = 0
+                if not stream_check("".join(parts)):
+                    await stream.close()
+                    logger.warning("Aborted streaming completion: incremental check failed")
+                    return None
+        content = "".join(parts)
+        return content if stream_check(content) else None
+
+    async def _generate_sections_async(self, user_data):
+        """Generate all four plan sections concurrently"""
+        return await asyncio.gather(
+            self._generate_workout_section(user_data),
+            self._generate_meal_section(user_data),
+            self._generate_form_guide_section(user_data),
+            self._generate_progress_section(user_data)
+        )
+
     def generate_first_plan(self, user_data):
         """Generate initial fitness plan for new users"""
         try:
-            # Generate the plan in sections to ensure completeness
-            workout_plan = self._generate_workout_section(user_data)
+            # Generate the sections concurrently - they are independent
+            # requests, so total latency is the slowest section rather
+            # than the sum of all four. Submitted to the service's
+            # dedicated loop so the async client always runs on the
+            # loop that owns its connections.
+            workout_plan, meal_plan, form_guide, progress_tracking = \
+                asyncio.run_coroutine_threadsafe(
+                    self._generate_sections_async(user_data), self._loop).result()
+
             if not workout_plan:
                 logger.error("Failed to generate valid workout plan section")
                 return None
-                
-            meal_plan = self._generate_meal_section(user_data)
+
             if not meal_plan:
                 logger.error("Failed to generate valid meal plan section")
                 return None
-                
-            form_guide = self._generate_form_guide_section(user_data)
+
             if not form_guide:
                 logger.error("Failed to generate valid form guide section")
                 return None
-                
-            progress_tracking = self._generate_progress_section(user_data)
+
             if not progress_tracking:
                 logger.error("Failed to generate valid progress tracking section")
                 return None
@@ -90,94 +436,81 @@ class AIService:
             logger.error(f"Error generating first plan: {str(e)}")
             raise
             
-    def _generate_workout_section(self, user_data: Dict[str, Any]) -> Optional[str]:
+    def _workout_prompts(self, user_data: Dict[str, Any]):
+        """Build the (system, user) prompt pair for the workout section"""
+        # Get available exercises for each body part
+        chest_exercises = self.exercise_db.get_exercises_by_body_part("chest")
+        back_exercises = self.exercise_db.get_exercises_by_body_part("back")
+        leg_exercises = self.exercise_db.get_exercises_by_body_part("legs")
+
+        # Create exercise suggestions
+        exercise_suggestions = {
+            "push": [ex.name for ex in chest_exercises[:5]],
+            "pull": [ex.name for ex in back_exercises[:5]],
+            "legs": [ex.name for ex in leg_exercises[:5]]
+        }
+
+        # Static block first; the exercise suggestions are stable per
+        # process and the short client profile comes last, keeping the
+        # cacheable prefix as long as possible
+        prompt = _WORKOUT_STATIC_PROMPT + f"""
+
+Suggested exercises:
+Push day: {', '.join(exercise_suggestions['push'])}
+Pull day: {', '.join(exercise_suggestions['pull'])}
+Leg day: {', '.join(exercise_suggestions['legs'])}
+
+CLIENT PROFILE:
+- Goal: {user_data['goal']}
+- Gender: {user_data['gender']}
+- Age: {user_data['age']}
+- Weight: {user_data['weight']}kg
+- Height: {user_data['height']}cm
+- Activity Level: {user_data['activity_level']}
+- Training Style: {user_data['training_style']}"""
+
+        return _WORKOUT_SYSTEM_PROMPT, prompt
+
+    async def _generate_workout_section(self, user_data: Dict[str, Any]) -> Optional[str]:
         """Generate the workout section with proper exercise formatting"""
         max_retries = 3
         current_try = 0
-        
-        while current_try < max_retries:
-            try:
-                # Get available exercises for each body part
-                chest_exercises = self.exercise_db.get_exercises_by_body_part("chest")
-                back_exercises = self.exercise_db.get_exercises_by_body_part("back")
-                leg_exercises = self.exercise_db.get_exercises_by_body_part("legs")
-                
-                # Create exercise suggestions
-                exercise_suggestions = {
-                    "push": [ex["name"] for ex in chest_exercises[:5]],
-                    "pull": [ex["name"] for ex in back_exercises[:5]],
-                    "legs": [ex["name"] for ex in leg_exercises[:5]]
-                }
-
-                system_prompt = """You are a NASM-certified personal trainer creating a detailed 3-day workout plan.
-                REQUIREMENTS:
-                1. Each day should have 3-5 exercises
-                2. Number each exercise with a colon (e.g. "1. Bench Press:")
-                3. Include these bullet points for EVERY exercise:
-                   * Sets: (specify number)
-                   * Reps: (specify range)
-                   * Rest: (in seconds)
-                   * Form: (clear instructions)
-                4. Match intensity to user's level
-                5. Focus on compound movements first
-                6. NO placeholder text or [brackets]
-                7. Use the format shown in the example below"""
-
-                example_format = """Day 1 - Push (Chest, Shoulders, Triceps)
---------------------------------------
-1. Bench Press:
-   * Sets: 3 sets
-   * Reps: 8-10
-   * Rest: 90s
-   * Weight/Intensity: Moderate (60-70% 1RM)
-   * Form: Lie flat on bench, feet planted. Grip bar slightly wider than shoulders. Lower to chest, press up.
-
-2. Shoulder Press:
-   * Sets: 3 sets
-   * Reps: 8-12
-   * Rest: 60s
-   * Form: Stand or sit with dumbbells at shoulder level, press overhead"""
 
-                prompt = f"""Create a 3-day workout plan for:
-                Goal: {user_data['goal']}
-                Gender: {user_data['gender']}
-                Age: {user_data['age']}
-                Weight: {user_data['weight']}kg
-                Height: {user_data['height']}cm
-                Activity Level: {user_data['activity_level']}
-                Training Style: {user_data['training_style']}
-
-                REQUIREMENTS:
-                1. Create 3-5 exercises for each day
-                2. Follow the format shown in the example
-                3. Include bullet points for Sets, Reps, Rest and Form for every exercise
-                4. Number exercises for each day
-
-                Suggested exercises:
-                Push day: {', '.join(exercise_suggestions['push'])}
-                Pull day: {', '.join(exercise_suggestions['pull'])}
-                Leg day: {', '.join(exercise_suggestions['legs'])}
-
-                FOLLOW THIS FORMAT:
-                {example_format}"""
+        # The prompts don't change between attempts, so build them once
+        system_prompt, prompt = self._workout_prompts(user_data)
 
-                payload = {
-                    "model": "gpt-4-turbo",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 4000,
-                    "response_format": { "type": "text" }
-                }
+        # This section is cached only after validation passes; caching
+        # raw completions inside _gen_section replayed rejected output
+        # on every retry (identical payload, guaranteed hit) and pinned
+        # the profile to the fallback plan for the cache TTL
+        cache_key = self.cache.key({
+            "section": "workout",
+            "model": self.models["workout"],
+            "messages": [system_prompt, prompt]
+        })
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving workout section from LLM cache")
+            return cached
 
-                response = self._call_openai_api("chat/completions", payload)
-                workout_section = response["choices"][0]["message"]["content"]
+        while current_try < max_retries:
+            try:
+                # First attempt samples two candidates in one request so
+                # a near-miss doesn't cost a second full round-trip
+                n = 2 if current_try == 0 else 1
+                # Retry attempts (n=1) stream with an incremental guard
+                # so a structurally broken completion is cut off early
+                # instead of generated in full and then rejected
+                result = await self._gen_section(system_prompt, prompt, max_tokens=4000, n=n,
+                                                 model=self.models["workout"],
+                                                 stream_check=_workout_stream_ok,
+                                                 use_cache=False)
 
                 # Simplified validation - just check for basic structure
-                if "Day 1" in workout_section and "Day 2" in workout_section and "Day 3" in workout_section:
-                    return workout_section
+                for workout_section in result if n > 1 else [result]:
+                    if workout_section and "Day 1" in workout_section and "Day 2" in workout_section and "Day 3" in workout_section:
+                        self.cache.set(cache_key, workout_section)
+                        return workout_section
 
                 logger.warning(f"Workout validation: Missing day sections (attempt {current_try + 1})")
                 current_try += 1
@@ -308,117 +641,155 @@ Day 3 - Legs
 """
         return plan
         
-    def _generate_meal_section(self, user_data):
+    def _meal_prompts(self, user_data, attempt=0, feedback=""):
+        """Build the (system, user) prompt pair for the meal section
+
+        The dietary warning strengthens with each retry attempt, and
+        validation feedback from a failed attempt is appended so the
+        model can correct it.
+        """
+        # Strengthen the prompt with each retry
+        if attempt == 0:
+            dietary_restriction_warning = "STRICTLY AVOID including ANY foods related to allergies."
+        elif attempt == 1:
+            dietary_restriction_warning = "⚠️ CRITICAL DIETARY SAFETY ISSUE: DO NOT INCLUDE ANY NUTS OR NUT PRODUCTS WHATSOEVER. This is a severe allergy case - patient safety depends on complete exclusion."
+        else:
+            dietary_restriction_warning = "🚨 MEDICAL EMERGENCY RISK: Patient has SEVERE NUT ALLERGY. Even trace amounts of nuts can cause anaphylaxis. DO NOT MENTION, SUGGEST, OR INCLUDE any nut products in any form. NEVER use words like 'nut', 'nuts', 'almond', 'peanut', etc."
+
+        # Static instructions lead; the attempt-dependent warning, the
+        # client profile and any validation feedback trail so the shared
+        # prefix stays cacheable
+        prompt = _MEAL_STATIC_PROMPT + f"""
+
+⚠️⚠️ {dietary_restriction_warning} ⚠️⚠️
+
+CLIENT PROFILE:
+- Diet Type: {user_data['diet_type']}
+- ALLERGIES/RESTRICTIONS: {user_data['allergies']}
+- Favorite Foods: {user_data['fav_foods']}"""
+
+        if feedback:
+            prompt += f"\n\nPREVIOUS ATTEMPT ERRORS: {feedback}\nFix these CRITICAL errors in your response."
+
+        return _MEAL_SYSTEM_PROMPT, prompt
+
+    async def _generate_meal_section(self, user_data):
         """Generate just the meal plan section"""
         max_retries = 3
         current_try = 0
         feedback = ""
-        
+
+        # Validated-content cache keyed on the first-attempt prompts
+        # (see _generate_workout_section for why raw completions must
+        # not be cached)
+        base_system, base_prompt = self._meal_prompts(user_data)
+        cache_key = self.cache.key({
+            "section": "meal",
+            "model": self.models["meal"],
+            "messages": [base_system, base_prompt]
+        })
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving meal section from LLM cache")
+            return cached
+
         while current_try < max_retries:
-            # Strengthen the prompt with each retry
-            if current_try == 0:
-                dietary_restriction_warning = "STRICTLY AVOID including ANY foods related to allergies."
-            elif current_try == 1:
-                dietary_restriction_warning = "⚠️ CRITICAL DIETARY SAFETY ISSUE: DO NOT INCLUDE ANY NUTS OR NUT PRODUCTS WHATSOEVER. This is a severe allergy case - patient safety depends on complete exclusion."
-            else:
-                dietary_restriction_warning = "🚨 MEDICAL EMERGENCY RISK: Patient has SEVERE NUT ALLERGY. Even trace amounts of nuts can cause anaphylaxis. DO NOT MENTION, SUGGEST, OR INCLUDE any nut products in any form. NEVER use words like 'nut', 'nuts', 'almond', 'peanut', etc."
-            
-            prompt = f"""
-You are a board-certified dietitian with 10+ years experience in clinical nutrition and sports dietetics.
+            system_prompt, prompt = self._meal_prompts(user_data, current_try, feedback)
 
-CREATE A COMPREHENSIVE 7-DAY MEAL PLAN FOR:
-- Diet Type: {user_data['diet_type']}
-- ALLERGIES/RESTRICTIONS: {user_data['allergies']}
-- Favorite Foods: {user_data['fav_foods']}
+            # First attempt samples two candidates in one request —
+            # prompt tokens are billed once — and the first that passes
+            # validation wins, skipping a serial retry round-trip
+            n = 2 if current_try == 0 else 1
+            try:
+                raw = await self._gen_section(
+                    system_prompt, prompt, max_tokens=4000,
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {
+                            "name": "meal_plan",
+                            "schema": MEAL_PLAN_SCHEMA,
+                            "strict": True
+                        }
+                    },
+                    n=n,
+                    model=self.models["meal"],
+                    use_cache=False
+                )
+            except Exception as e:
+                # API errors (not just the transient ones _gen_section
+                # retries) must not escape — the safe fallback below is
+                # the contract for a meal section that can't be generated
+                logger.error(f"Error generating meal section: {str(e)}")
+                current_try += 1
+                continue
 
-⚠️⚠️ {dietary_restriction_warning} ⚠️⚠️
+            for candidate in raw if n > 1 else [raw]:
+                try:
+                    meal_section = self._render_meal_plan(json.loads(candidate))
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    logger.warning(f"Malformed structured meal plan (attempt {current_try+1}): {str(e)}")
+                    continue
 
-CRITICAL ALLERGEN INFORMATION:
-* If "nuts" are mentioned in allergies, NEVER include or mention ANY:
-  - Tree nuts (almonds, walnuts, cashews, pistachios, pecans, hazelnuts)
-  - Peanuts or peanut products
-  - Almond milk, almond flour, nut oils, nut butters
-  - Seeds that could be confused with nuts
-  - Products that may contain nuts (granola, trail mix, some cereals)
-* Use NUT-FREE ALTERNATIVES ONLY:
-  - Instead of almond milk, use oat milk, soy milk, or coconut milk
-  - Instead of nut butter, use sunflower seed butter or tahini
-  - Instead of nuts in recipes, use seeds, beans, or crispy chickpeas
+                # Additional manual filtering for nut-related terms
+                if 'nut' in user_data.get('allergies', '').lower():
+                    meal_section = self._filter_allergens_from_text(meal_section, ["nut", "almond", "peanut", "cashew", "walnut", "pecan", "hazelnut", "pistachio", "macadamia"])
+                    if meal_section is None:
+                        continue
 
-For EACH day (Monday through Sunday), include:
-* Breakfast (with calories)
-* Morning Snack (with calories)
-* Lunch (with calories) 
-* Afternoon Snack (with calories)
-* Dinner (with calories)
-* Daily totals for calories and macros
+                # Validate just the meal section
+                meal_violations = validate_meal_plan(meal_section, user_data)
+
+                if not meal_violations:
+                    self.cache.set(cache_key, meal_section)
+                    return meal_section
+
+                feedback = ", ".join(meal_violations)
+                logger.warning(f"Meal section validation issues (attempt {current_try+1}): {meal_violations}")
 
-DO NOT include any other sections. ONLY provide the meal plan.
-"""
-            if feedback:
-                prompt += f"\n\nPREVIOUS ATTEMPT ERRORS: {feedback}\nFix these CRITICAL errors in your response."
-                
-            system_prompt = (
-                "You are a registered dietitian with specialized training in food allergies and clinical nutrition. "
-                "Your PRIMARY RESPONSIBILITY is ensuring patient safety by strictly following dietary restrictions. "
-                "Lives depend on your ability to COMPLETELY EXCLUDE all allergenic foods. "
-                "NEVER compromise on dietary restrictions for taste, convenience, or nutritional goals."
-            )
-            
-            payload = {
-                "model": "gpt-4-turbo",
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,  # Lower temperature for more deterministic output
-                "max_tokens": 4000
-            }
-            
-            response = self._call_openai_api("chat/completions", payload)
-            meal_section = response["choices"][0]["message"]["content"]
-            
-            # Additional manual filtering for nut-related terms
-            if 'nut' in user_data.get('allergies', '').lower():
-                meal_section = self._filter_allergens_from_text(meal_section, ["nut", "almond", "peanut", "cashew", "walnut", "pecan", "hazelnut", "pistachio", "macadamia"])
-            
-            # Validate just the meal section
-            meal_violations = validate_meal_plan(meal_section, user_data)
-            
-            if not meal_violations:
-                return meal_section
-            
-            feedback = ", ".join(meal_violations)
-            logger.warning(f"Meal section validation issues (attempt {current_try+1}): {meal_violations}")
             current_try += 1
         
         # If we've failed after max retries, generate a safe fallback plan
         logger.warning("Attempting to generate a safe fallback meal plan...")
         return self._generate_safe_fallback_meal_plan(user_data)
     
+    def _render_meal_plan(self, data) -> str:
+        """Render the structured meal-plan JSON into the markdown layout
+        the validators and plan display expect"""
+        sections = []
+        for day in data["days"]:
+            lines = [f"## {day['day']}", ""]
+            for label, key in (
+                ("Breakfast", "breakfast"),
+                ("Morning Snack", "morning_snack"),
+                ("Lunch", "lunch"),
+                ("Afternoon Snack", "afternoon_snack"),
+                ("Dinner", "dinner")
+            ):
+                meal = day[key]
+                lines.append(f"### {label} ({meal['calories']} calories)")
+                lines.append(meal['description'])
+                lines.append("")
+            lines.append("### Daily Totals")
+            lines.append(f"- Calories: {day['total_calories']}")
+            lines.append(f"- Macros: {day['macros']}")
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
     def _filter_allergens_from_text(self, text, allergen_terms):
-        """Manually filter out any mention of allergens from text"""
-        lower_text = text.lower()
-        
-        # Find all lines that contain allergen terms
-        lines = text.split('\n')
-        clean_lines = []
-        
-        for line in lines:
-            contains_allergen = False
-            for term in allergen_terms:
-                if term in line.lower():
-                    contains_allergen = True
-                    break
-            
-            if not contains_allergen:
-                clean_lines.append(line)
-        
+        """Manually filter out any mention of allergens from text
+
+        One compiled-regex pass drops every line containing a term,
+        instead of a Python-level scan of each line against each term.
+        """
+        pattern = _allergen_line_pattern(frozenset(allergen_terms))
+        total_lines = text.count('\n') + 1
+        clean, removed = pattern.subn('', text)
+
         # If we removed too many lines, the plan is probably compromised
-        if len(clean_lines) < len(lines) * 0.8:
+        if total_lines - removed < total_lines * 0.8:
             return None
-            
-        return '\n'.join(clean_lines)
+
+        return clean
     
     def _generate_safe_fallback_meal_plan(self, user_data):
         """Generate a very safe meal plan with guaranteed allergen-free options"""
@@ -440,121 +811,86 @@ DO NOT include any other sections. ONLY provide the meal plan.
         if is_nut_allergy:
             if 'granola' in safe_foods.get('carbs', []):
                 safe_foods['carbs'].remove('granola')
-        
+
+        # Every day shares the same safe menu, so the day body is
+        # rendered once and reused; the parts list is joined in one pass
+        # instead of growing the plan string with repeated +=
+        day_body = "\n".join([
+            "### Breakfast (400-500 calories)",
+            f"- Oatmeal with {safe_foods['fruits'][0]} and honey",
+            "- 2 boiled eggs",
+            "",
+            "### Morning Snack (150-200 calories)",
+            f"- Greek yogurt with {safe_foods['fruits'][1]}",
+            "",
+            "### Lunch (500-600 calories)",
+            f"- {safe_foods['proteins'][0]} with {safe_foods['carbs'][0]} and {safe_foods['veggies'][0]}",
+            "- Side salad with olive oil dressing",
+            "",
+            "### Afternoon Snack (150-200 calories)",
+            f"- {safe_foods['fruits'][2]} and a small handful of seeds",
+            "",
+            "### Dinner (500-600 calories)",
+            f"- {safe_foods['proteins'][1]} with {safe_foods['carbs'][1]} and roasted {safe_foods['veggies'][1]}",
+            "",
+            "### Daily Totals",
+            "- Calories: ~1800-2000",
+            "- Protein: 100-120g",
+            "- Carbs: 200-250g",
+            "- Fat: 50-65g",
+            "",
+            ""
+        ])
+
         # Generate a simple 7-day plan
         days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+        parts = [plan]
+        parts.extend(f"## {day}\n\n{day_body}" for day in days)
+        return "".join(parts)
         
-        for day in days:
-            plan += f"## {day}\n\n"
-            
-            # Breakfast
-            plan += "### Breakfast (400-500 calories)\n"
-            plan += f"- Oatmeal with {safe_foods['fruits'][0]} and honey\n"
-            plan += "- 2 boiled eggs\n\n"
-            
-            # Morning Snack
-            plan += "### Morning Snack (150-200 calories)\n"
-            plan += f"- Greek yogurt with {safe_foods['fruits'][1]}\n\n"
-            
-            # Lunch
-            plan += "### Lunch (500-600 calories)\n"
-            plan += f"- {safe_foods['proteins'][0]} with {safe_foods['carbs'][0]} and {safe_foods['veggies'][0]}\n"
-            plan += "- Side salad with olive oil dressing\n\n"
-            
-            # Afternoon Snack
-            plan += "### Afternoon Snack (150-200 calories)\n"
-            plan += f"- {safe_foods['fruits'][2]} and a small handful of seeds\n\n"
-            
-            # Dinner
-            plan += "### Dinner (500-600 calories)\n"
-            plan += f"- {safe_foods['proteins'][1]} with {safe_foods['carbs'][1]} and roasted {safe_foods['veggies'][1]}\n\n"
-            
-            # Daily Totals
-            plan += "### Daily Totals\n"
-            plan += "- Calories: ~1800-2000\n"
-            plan += "- Protein: 100-120g\n"
-            plan += "- Carbs: 200-250g\n"
-            plan += "- Fat: 50-65g\n\n"
-        
-        return plan
-        
-    def _generate_form_guide_section(self, user_data):
-        """Generate just the form and technique guide section"""
-        prompt = f"""
-Create a detailed form and technique guide for a fitness plan tailored to:
+    def _form_prompts(self, user_data):
+        """Build the (system, user) prompt pair for the form guide section"""
+        prompt = _FORM_STATIC_PROMPT + f"""
+
+CLIENT PROFILE:
 - Goal: {user_data['goal']}
-- Training Style: {user_data['training_style']}
+- Training Style: {user_data['training_style']}"""
 
-Include detailed instructions for common exercises in a {user_data['training_style']} routine, covering:
-* Starting position
-* Movement execution
-* Breathing pattern
-* Common mistakes
-* Safety considerations
-* Progressive overload tips
+        return _FORM_SYSTEM_PROMPT, prompt
 
-DO NOT include any other sections. ONLY provide the form and technique guide.
-"""
-        system_prompt = (
-            "You are a certified fitness instructor creating only the form and technique guide portion of a fitness plan. "
-            "Provide detailed, practical advice on proper exercise execution and safety."
-        )
-        
-        payload = {
-            "model": "gpt-4-turbo",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2000
-        }
-        
-        response = self._call_openai_api("chat/completions", payload)
-        return response["choices"][0]["message"]["content"]
-        
-    def _generate_progress_section(self, user_data):
-        """Generate just the progress tracking section"""
-        prompt = f"""
-Create a progress tracking guide for a fitness plan tailored to:
+    async def _generate_form_guide_section(self, user_data):
+        """Generate just the form and technique guide section"""
+        system_prompt, prompt = self._form_prompts(user_data)
+        return await self._gen_section(system_prompt, prompt, max_tokens=2000,
+                                       model=self.models["form"])
+
+    def _progress_prompts(self, user_data):
+        """Build the (system, user) prompt pair for the progress section"""
+        prompt = _PROGRESS_STATIC_PROMPT + f"""
+
+CLIENT PROFILE:
 - Goal: {user_data['goal']}
 - Gender: {user_data['gender']}
-- Age: {user_data['age']}
+- Age: {user_data['age']}"""
 
-Include specific recommendations for:
-* Weekly measurements (what to measure and how)
-* Performance metrics to track
-* Progress photos (how and when to take them)
-* Adherence tracking methods
-* How to adjust the plan based on progress
+        return _PROGRESS_SYSTEM_PROMPT, prompt
 
-DO NOT include any other sections. ONLY provide the progress tracking guide.
-"""
-        system_prompt = (
-            "You are a fitness coach creating only the progress tracking portion of a fitness plan. "
-            "Provide practical, actionable methods for tracking progress toward fitness goals."
-        )
-        
-        payload = {
-            "model": "gpt-4-turbo",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2000
-        }
-        
-        response = self._call_openai_api("chat/completions", payload)
-        return response["choices"][0]["message"]["content"]
+    async def _generate_progress_section(self, user_data):
+        """Generate just the progress tracking section"""
+        system_prompt, prompt = self._progress_prompts(user_data)
+        # Outputs run well under this; a tight budget also means the
+        # provider reserves less capacity for the request
+        return await self._gen_section(system_prompt, prompt, max_tokens=600,
+                                       model=self.models["progress"])
 
     def generate_fitness_plan(self, user_data, previous_plans=None, journal_summary="No journal data available."):
         """Generate updated fitness plan based on user data, previous plans and journal entries"""
         try:
             if not previous_plans:
                 return self.generate_first_plan(user_data)
-            
-            prompt = FITNESS_PLAN_PROMPT.format(
+
+            prompt = render_fitness_plan_user(
                 **user_data,
                 previous_plans=previous_plans if previous_plans else "No previous plans",
                 journal_summary=journal_summary
@@ -570,21 +906,10 @@ DO NOT include any other sections. ONLY provide the progress tracking guide.
                 if feedback:
                     current_prompt += f"\n\nIMPORTANT CORRECTION NEEDED: {feedback}\nPlease fix these issues in your response."
                 
-                system_prompt = (
-                    "You are an expert fitness coach and nutritionist creating personalized plans. "
-                    "Follow these critical guidelines:\n"
-                    "1. Format exercises EXACTLY as numbered items (e.g., '1. Bench Press:') with proper details\n"
-                    "2. STRICTLY AVOID all foods related to the user's allergies in the meal plan\n"
-                    "3. Include exercises for each workout day\n"
-                    "4. NEVER use placeholder text or '[repeat format]' instructions\n"
-                    "5. Write everything out in complete detail\n"
-                    "6. Use prior plans and progress to create appropriate progressions"
-                )
-                
                 payload = {
                     "model": "gpt-4-turbo",
                     "messages": [
-                        {"role": "system", "content": system_prompt},
+                        {"role": "system", "content": _UPDATE_PLAN_SYSTEM_PROMPT},
                         {"role": "user", "content": current_prompt}
                     ],
                     "temperature": 0.7,
@@ -615,31 +940,137 @@ DO NOT include any other sections. ONLY provide the progress tracking guide.
             logger.error(f"Error generating fitness plan: {str(e)}")
             raise
 
+    def generate_plan_stream(self, user_data, previous_plans=None, journal_summary="No journal data available."):
+        """Stream an updated fitness plan token-by-token for st.write_stream
+
+        Yields content deltas as they arrive so the UI can render at
+        time-to-first-token instead of blocking on the whole completion.
+        Because tokens are surfaced before the completion finishes, the
+        caller is responsible for validating the assembled text.
+        """
+        prompt = render_fitness_plan_user(
+            **user_data,
+            previous_plans=previous_plans if previous_plans else "No previous plans",
+            journal_summary=journal_summary
+        )
+
+        stream = self.client.chat.completions.create(
+            model="gpt-4-turbo",
+            messages=[
+                {"role": "system", "content": _UPDATE_PLAN_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=4000,
+            stream=True
+        )
+
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    def submit_progress_summary(self, username: str, journal_summary: str) -> str:
+        """Queue progress-summary and motivational-message generation as a
+        Batch API job
+
+        Neither output is interactive, so routing them through the Batch
+        API (~50% cheaper, up to 24h completion window) keeps real-time
+        TPM budget for plan generation. Returns the batch id for polling.
+        """
+        rows = [
+            {
+                "custom_id": f"{username}-progress-summary",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-4-turbo",
+                    "messages": [
+                        {"role": "system", "content": SYSTEM_PROMPT_HEALTH_COACH},
+                        {"role": "user", "content": PROGRESS_SUMMARY_PROMPT.format(journal_dataframe=journal_summary)}
+                    ],
+                    "max_tokens": 1000
+                }
+            },
+            {
+                "custom_id": f"{username}-motivation",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-4-turbo",
+                    "messages": [
+                        {"role": "system", "content": SYSTEM_PROMPT_HEALTH_COACH},
+                        {"role": "user", "content": MOTIVATIONAL_MESSAGE_PROMPT}
+                    ],
+                    "max_tokens": 300
+                }
+            }
+        ]
+
+        jsonl = "\n".join(json.dumps(row) for row in rows)
+        batch_file = self.client.files.create(
+            file=("progress_batch.jsonl", jsonl.encode()),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted progress batch {batch.id} for {username}")
+        return batch.id
+
+    def get_batch_results(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """Fetch results for a submitted batch
+
+        Returns {custom_id: completion text} once the batch has completed,
+        or None while it is still in flight.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            logger.info(f"Batch {batch_id} status: {batch.status}")
+            return None
+
+        output = self.client.files.content(batch.output_file_id)
+        results = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            results[row["custom_id"]] = row["response"]["body"]["choices"][0]["message"]["content"]
+        return results
+
     def _format_user_data(self, user_data: Dict[str, Any]) -> str:
         """Format user data for the AI prompt"""
-        formatted_data = []
-        for key, value in user_data.items():
-            if key == 'name':
-                formatted_data.append(f"Name: {value}")
-            elif key == 'goal':
-                formatted_data.append(f"Goal: {value}")
-            elif key == 'gender':
-                formatted_data.append(f"Gender: {value}")
-            elif key == 'age':
-                formatted_data.append(f"Age: {value}")
-            elif key == 'weight':
-                formatted_data.append(f"Weight: {value} kg")
-            elif key == 'height':
-                formatted_data.append(f"Height: {value} cm")
-            elif key == 'activity_level':
-                formatted_data.append(f"Activity Level: {value}")
-            elif key == 'training_style':
-                formatted_data.append(f"Training Style: {value}")
-            elif key == 'diet_type':
-                formatted_data.append(f"Diet Type: {value}")
-            elif key == 'allergies' and value:
-                formatted_data.append(f"Allergies/Restrictions: {value}")
-            elif key == 'fav_foods' and value:
-                formatted_data.append(f"Favorite Foods: {value}")
-        
-        return "\n".join(formatted_data)
\ No newline at end of file
+        # Sorted items make an order-insensitive, hashable key; the same
+        # profile formats once per process however many plans it drives
+        return _format_user_data_cached(tuple(sorted(user_data.items())))
+
+@lru_cache(maxsize=1024)
+def _format_user_data_cached(items) -> str:
+    formatted_data = []
+    for key, value in items:
+        if key == 'name':
+            formatted_data.append(f"Name: {value}")
+        elif key == 'goal':
+            formatted_data.append(f"Goal: {value}")
+        elif key == 'gender':
+            formatted_data.append(f"Gender: {value}")
+        elif key == 'age':
+            formatted_data.append(f"Age: {value}")
+        elif key == 'weight':
+            formatted_data.append(f"Weight: {value} kg")
+        elif key == 'height':
+            formatted_data.append(f"Height: {value} cm")
+        elif key == 'activity_level':
+            formatted_data.append(f"Activity Level: {value}")
+        elif key == 'training_style':
+            formatted_data.append(f"Training Style: {value}")
+        elif key == 'diet_type':
+            formatted_data.append(f"Diet Type: {value}")
+        elif key == 'allergies' and value:
+            formatted_data.append(f"Allergies/Restrictions: {value}")
+        elif key == 'fav_foods' and value:
+            formatted_data.append(f"Favorite Foods: {value}")
+
+    return "\n".join(formatted_data)
\ No newline at end of file
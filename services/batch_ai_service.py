@@ -0,0 +1,141 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from config.prompts import MEAL_PLAN_SCHEMA
+from utils.validators import validate_plan_content, validate_meal_plan
+from services.ai_service_alt import AIService
+
+logger = logging.getLogger(__name__)
+
+# Sections of a complete plan, in render order
+_SECTIONS = ("workout", "meal", "form", "progress")
+
+class BatchAIService:
+    """Bulk plan generation through the OpenAI Batch API.
+
+    Non-interactive work — nightly plan refreshes, backfills after a
+    prompt change, regression runs — doesn't need sub-minute latency,
+    and batched requests are billed at half price with a 24h completion
+    window. Prompts, models and token budgets are shared with the
+    interactive AIService so batch output matches what a user would get
+    from the live path.
+    """
+
+    def __init__(self, ai_service: Optional[AIService] = None):
+        self.ai_service = ai_service or AIService()
+        self.client = self.ai_service.client
+
+    def _section_rows(self, user_data: Dict[str, Any]):
+        """Yield one Batch API request row per plan section for a user"""
+        svc = self.ai_service
+        specs = {
+            "workout": (svc._workout_prompts(user_data), 4000, None),
+            "meal": (svc._meal_prompts(user_data), 4000, {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "meal_plan",
+                    "schema": MEAL_PLAN_SCHEMA,
+                    "strict": True
+                }
+            }),
+            "form": (svc._form_prompts(user_data), 2000, None),
+            "progress": (svc._progress_prompts(user_data), 600, None),
+        }
+        for section in _SECTIONS:
+            (system_prompt, prompt), max_tokens, response_format = specs[section]
+            body = {
+                "model": svc.models[section],
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.7,
+                "max_tokens": max_tokens
+            }
+            if response_format is not None:
+                body["response_format"] = response_format
+            yield {
+                "custom_id": f"{user_data['name']}:{section}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            }
+
+    def submit_plans_batch(self, users_data: List[Dict[str, Any]]) -> str:
+        """Queue full-plan generation for a list of user profiles.
+
+        Serializes the four section requests per user as JSONL, uploads
+        the file and creates the batch. Returns the batch id for polling
+        with collect_plans.
+        """
+        rows = [row for user_data in users_data
+                for row in self._section_rows(user_data)]
+        jsonl = "\n".join(json.dumps(row) for row in rows)
+        batch_file = self.client.files.create(
+            file=("plans_batch.jsonl", jsonl.encode()),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted plan batch {batch.id} covering {len(users_data)} users")
+        return batch.id
+
+    def collect_plans(self, batch_id: str,
+                      users_data: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, str]]:
+        """Assemble complete plans from a finished batch.
+
+        Returns {username: plan markdown} once the batch has completed,
+        or None while it is still in flight. Users whose sections are
+        missing or fail validation are dropped with a warning rather
+        than failing the whole batch. Pass the submitted users_data to
+        also run the per-user meal plan validation.
+        """
+        results = self.ai_service.get_batch_results(batch_id)
+        if results is None:
+            return None
+
+        profiles = {u['name']: u for u in users_data} if users_data else {}
+
+        # Group section completions back by user
+        sections: Dict[str, Dict[str, str]] = {}
+        for custom_id, content in results.items():
+            username, _, section = custom_id.rpartition(":")
+            sections.setdefault(username, {})[section] = content
+
+        plans = {}
+        for username, parts in sections.items():
+            missing = [s for s in _SECTIONS if s not in parts]
+            if missing:
+                logger.warning(f"Batch plan for {username} missing sections: {missing}")
+                continue
+
+            try:
+                meal_plan = self.ai_service._render_meal_plan(json.loads(parts["meal"]))
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                logger.warning(f"Malformed batch meal plan for {username}: {str(e)}")
+                continue
+
+            complete_plan = (
+                "# PERSONALIZED FITNESS PLAN FOR " + username.upper() + "\n\n" +
+                "## WEEKLY WORKOUT PLAN\n" + parts["workout"] + "\n\n" +
+                "## WEEKLY MEAL PLAN\n" + meal_plan + "\n\n" +
+                "## FORM AND TECHNIQUE GUIDE\n" + parts["form"] + "\n\n" +
+                "## PROGRESS TRACKING\n" + parts["progress"]
+            )
+
+            if username in profiles:
+                meal_violations = validate_meal_plan(complete_plan, profiles[username])
+                if meal_violations:
+                    logger.warning(f"Batch meal plan for {username} failed validation: {meal_violations}")
+                    continue
+
+            content_issues = validate_plan_content(complete_plan)
+            if content_issues:
+                logger.warning(f"Batch plan for {username} has minor content issues: {content_issues}")
+
+            plans[username] = complete_plan
+
+        return plans
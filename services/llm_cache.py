@@ -0,0 +1,48 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """Content-addressed on-disk cache for chat completions.
+
+    Plan prompts are deterministic functions of the user profile, so a
+    repeat request with an identical payload can be served without
+    re-billing the API. Keys hash the full request payload (model,
+    messages, temperature, max_tokens, ...) so anything that could
+    change the completion — a different model, a retry with feedback
+    appended — misses cleanly instead of returning a stale answer.
+    """
+
+    def __init__(self, cache_dir: str = ".plan_cache", ttl: int = 7 * 86400):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def key(self, payload: Dict[str, Any]) -> str:
+        """Content-addressed key for a request payload"""
+        canonical = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached completion, ignoring entries older than the TTL"""
+        path = os.path.join(self.cache_dir, f"{key}.txt")
+        try:
+            if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return f.read()
+        except OSError as e:
+            logger.warning(f"Error reading LLM cache: {str(e)}")
+        return None
+
+    def set(self, key: str, content: str) -> None:
+        """Store a completion"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(os.path.join(self.cache_dir, f"{key}.txt"), 'w', encoding='utf-8') as f:
+                f.write(content)
+        except OSError as e:
+            logger.warning(f"Error writing LLM cache: {str(e)}")
@@ -1,12 +1,22 @@
+from collections import namedtuple
 from datetime import datetime, timedelta
 import logging
+from sqlalchemy import func
+from sqlalchemy.orm import undefer
 from database.connection import db_manager
 from database.models import Plan, UserProfile, Journal, UserStatus
 from services.user_service import UserService
-import copy
 
 logger = logging.getLogger(__name__)
 
+# Everything the next-week generation path reads before calling the AI
+PlanGenerationContext = namedtuple(
+    'PlanGenerationContext', ['has_journal', 'previous_plans', 'journal_summary'])
+
+# What the home page needs to render: status fields plus the latest plan
+HomeContext = namedtuple(
+    'HomeContext', ['current_week', 'first_plan_generated', 'latest_plan'])
+
 class PlanService:
     def get_latest_plan(self, username):
         """Get the user's most recent fitness plan"""
@@ -14,34 +24,15 @@ class PlanService:
             plan = session.query(Plan)\
                 .filter(Plan.name == username)\
                 .order_by(Plan.created_date.desc())\
+                .options(undefer(Plan.plan))\
                 .first()
-                
-            # If plan exists, create a detached copy with all attributes loaded
+
+            # Column attributes are loaded by the single SELECT above;
+            # detach the row so it stays readable after the scope closes
             if plan:
-                # Create a dictionary of the plan's attributes
-                plan_dict = {
-                    'id': plan.id,
-                    'name': plan.name,
-                    'age': plan.age,
-                    'gender': plan.gender,
-                    'goal': plan.goal,
-                    'weight': plan.weight,
-                    'height': plan.height,
-                    'activity_level': plan.activity_level,
-                    'training_style': plan.training_style,
-                    'diet_type': plan.diet_type,
-                    'plan': plan.plan,
-                    'created_date': plan.created_date
-                }
-                
-                # Create a detached Plan object with the copied attributes
-                detached_plan = Plan()
-                for key, value in plan_dict.items():
-                    setattr(detached_plan, key, value)
-                
-                return detached_plan
-            
-            return None
+                session.expunge(plan)
+
+            return plan
 
     def save_plan(self, username, plan_content):
         """Save a new fitness plan"""
@@ -90,73 +81,110 @@ class PlanService:
     def get_previous_plans(self, username, limit=3):
         """Get user's previous plans for context when generating new plans"""
         with db_manager.session_scope() as session:
-            plans = session.query(Plan)\
-                .filter(Plan.name == username)\
-                .order_by(Plan.created_date.desc())\
-                .limit(limit)\
-                .all()
-                
-            if not plans:
-                return None
-                
-            # Format plans for use in the AI prompt
-            plan_texts = []
-            for i, plan in enumerate(plans):
-                plan_date = plan.created_date.strftime("%Y-%m-%d")
-                plan_texts.append(f"PLAN {i+1} ({plan_date}):\n{plan.plan}\n\n")
-                
-            return "\n".join(plan_texts)
+            return self._previous_plans(session, username, limit)
+
+    @staticmethod
+    def _previous_plans(session, username, limit):
+        plans = session.query(Plan)\
+            .filter(Plan.name == username)\
+            .order_by(Plan.created_date.desc())\
+            .options(undefer(Plan.plan))\
+            .limit(limit)\
+            .all()
+
+        if not plans:
+            return None
+
+        # Format plans for use in the AI prompt
+        plan_texts = []
+        for i, plan in enumerate(plans):
+            plan_date = plan.created_date.strftime("%Y-%m-%d")
+            plan_texts.append(f"PLAN {i+1} ({plan_date}):\n{plan.plan}\n\n")
+
+        return "\n".join(plan_texts)
 
     def get_journal_summary(self, username, weeks=4):
         """Get a summary of recent journal entries for context in AI prompts"""
         with db_manager.session_scope() as session:
-            # Get entries from the last few weeks
-            cutoff_date = datetime.now().date() - timedelta(weeks=weeks)
-            entries = session.query(Journal)\
-                .filter(Journal.name == username)\
-                .filter(Journal.entry_date >= cutoff_date)\
-                .order_by(Journal.entry_date)\
-                .all()
-                
-            if not entries:
-                return "No journal data available."
-                
-            # Create a summary of journal data
-            summary = "JOURNAL SUMMARY:\n"
-            for entry in entries:
-                summary += f"Date: {entry.entry_date.strftime('%Y-%m-%d')}\n"
-                summary += f"Weight: {entry.weight}kg\n"
-                summary += f"Mood: {entry.mood}\n"
-                summary += f"Energy: {entry.energy}\n"
-                summary += f"Workout Adherence: {entry.workout_adherence}%\n"
-                summary += f"Diet Adherence: {entry.diet_adherence}%\n"
-                if entry.notes:
-                    summary += f"Notes: {entry.notes}\n"
-                summary += "\n"
-                
-            return summary
+            return self._journal_summary(session, username, weeks)
+
+    @staticmethod
+    def _journal_summary(session, username, weeks):
+        # Get entries from the last few weeks
+        cutoff_date = datetime.now().date() - timedelta(weeks=weeks)
+        entries = session.query(Journal)\
+            .filter(Journal.name == username)\
+            .filter(Journal.entry_date >= cutoff_date)\
+            .order_by(Journal.entry_date)\
+            .all()
+
+        if not entries:
+            return "No journal data available."
+
+        # Create a summary of journal data
+        summary = "JOURNAL SUMMARY:\n"
+        for entry in entries:
+            summary += f"Date: {entry.entry_date.strftime('%Y-%m-%d')}\n"
+            summary += f"Weight: {entry.weight}kg\n"
+            summary += f"Mood: {entry.mood}\n"
+            summary += f"Energy: {entry.energy}\n"
+            summary += f"Workout Adherence: {entry.workout_adherence}%\n"
+            summary += f"Diet Adherence: {entry.diet_adherence}%\n"
+            if entry.notes:
+                summary += f"Notes: {entry.notes}\n"
+            summary += "\n"
+
+        return summary
 
     def has_journal_for_week(self, username, week):
         """Check if user has submitted journal entry for current week"""
         try:
             with db_manager.session_scope() as session:
-                # Get user status to find when they started
-                status = session.query(UserStatus).filter_by(name=username).first()
-                if not status or not status.last_journal_date:
-                    return False
-                    
-                # Check for entries in the last 7 days
-                one_week_ago = datetime.now().date() - timedelta(days=7)
-                recent_entry = session.query(Journal)\
-                    .filter(Journal.name == username)\
-                    .filter(Journal.entry_date >= one_week_ago)\
-                    .first()
-                    
-                return recent_entry is not None
+                return self._has_recent_journal(session, username)
         except Exception as e:
             logger.error(f"Error checking journal entry: {str(e)}")
             return False
 
+    @staticmethod
+    def _has_recent_journal(session, username):
+        # Get user status to find when they started
+        status = session.query(UserStatus).filter_by(name=username).first()
+        if not status or not status.last_journal_date:
+            return False
+
+        # Check for entries in the last 7 days
+        one_week_ago = datetime.now().date() - timedelta(days=7)
+        recent_entry = session.query(Journal)\
+            .filter(Journal.name == username)\
+            .filter(Journal.entry_date >= one_week_ago)\
+            .first()
+
+        return recent_entry is not None
+
+    def get_plan_generation_context(self, username, weeks=1):
+        """Gather everything the next-week generation path needs at once.
+
+        The journal check, previous plans and journal summary used to be
+        three service calls, each opening its own session — three pool
+        checkouts before the AI request even started. One session scope
+        serves all three, and when no recent journal exists the heavier
+        queries are skipped entirely.
+        """
+        try:
+            with db_manager.session_scope() as session:
+                if not self._has_recent_journal(session, username):
+                    return PlanGenerationContext(
+                        False, None, "No journal data available.")
+
+                return PlanGenerationContext(
+                    True,
+                    self._previous_plans(session, username, limit=3),
+                    self._journal_summary(session, username, weeks),
+                )
+        except Exception as e:
+            logger.error(f"Error building plan generation context: {str(e)}")
+            return PlanGenerationContext(False, None, "No journal data available.")
+
     def get_user_progress(self, username):
         """Get user's progress data for visualization"""
         with db_manager.session_scope() as session:
@@ -164,72 +192,92 @@ class PlanService:
                 .filter(Journal.name == username)\
                 .order_by(Journal.entry_date)\
                 .all()
-                
-            # Create detached copies of the journal entries
-            detached_journals = []
-            for journal in journals:
-                # Create a dictionary of the journal's attributes
-                journal_dict = {
-                    'id': journal.id,
-                    'name': journal.name,
-                    'entry_date': journal.entry_date,
-                    'weight': journal.weight,
-                    'mood': journal.mood,
-                    'energy': journal.energy,
-                    'workout_adherence': journal.workout_adherence,
-                    'diet_adherence': journal.diet_adherence,
-                    'notes': journal.notes
-                }
-                
-                # Create a detached Journal object with the copied attributes
-                detached_journal = Journal()
-                for key, value in journal_dict.items():
-                    setattr(detached_journal, key, value)
-                
-                detached_journals.append(detached_journal)
-                
-            return detached_journals
+
+            # Detach the fully loaded rows instead of copying them
+            # attribute by attribute in Python
+            session.expunge_all()
+
+            return journals
             
+    def get_home_context(self, username):
+        """Status fields and the latest plan in one session scope.
+
+        The home page used to read user status and the latest plan
+        through two separately cached helpers — two sessions, and two
+        snapshots that could disagree right after a save. One scope
+        returns both consistently.
+        """
+        with db_manager.session_scope() as session:
+            plan = session.query(Plan)\
+                .filter(Plan.name == username)\
+                .order_by(Plan.created_date.desc(), Plan.id.desc())\
+                .options(undefer(Plan.plan))\
+                .first()
+            if plan:
+                session.expunge(plan)
+
+            status = session.query(UserStatus).filter_by(name=username).first()
+            if status:
+                return HomeContext(status.current_week,
+                                   status.first_plan_generated, plan)
+
+            # No status row yet: infer the same defaults get_user_status uses
+            return HomeContext(1 if plan else 0, plan is not None, plan)
+
+    def get_latest_week_number(self, username):
+        """Get the user's latest week number without loading any plans.
+
+        Week numbers are positional (week 1 is the oldest plan), so the
+        latest week is simply the plan count — one scalar SELECT instead
+        of pulling every plan body just to take a max.
+        """
+        with db_manager.session_scope() as session:
+            return session.query(func.count(Plan.id))\
+                .filter(Plan.name == username)\
+                .scalar() or 0
+
+    def get_plan_by_week(self, username, week):
+        """Get a single week's plan without loading the rest"""
+        if week < 1:
+            return None
+        with db_manager.session_scope() as session:
+            plan = session.query(Plan)\
+                .filter(Plan.name == username)\
+                .order_by(Plan.created_date.asc(), Plan.id.asc())\
+                .options(undefer(Plan.plan))\
+                .offset(week - 1)\
+                .limit(1)\
+                .first()
+
+            if plan:
+                session.expunge(plan)
+                plan.week_number = week
+
+            return plan
+
     def get_all_user_plans(self, username):
-        """Get all fitness plans for a user with week numbers"""
+        """Get all fitness plans for a user with week numbers.
+
+        Plan bodies stay deferred here — only lightweight columns load.
+        Callers that need the markdown should fetch the specific week
+        with get_plan_by_week instead.
+        """
         with db_manager.session_scope() as session:
             # Get all plans ordered by creation date (oldest first)
             plans = session.query(Plan)\
                 .filter(Plan.name == username)\
                 .order_by(Plan.created_date.asc())\
                 .all()
-                
+
             if not plans:
                 return []
-                
-            # Create detached copies of the plans with week numbers
-            all_plans = []
+
+            # One SELECT loads every column; detach the rows rather than
+            # rebuilding each one attribute by attribute in Python
+            session.expunge_all()
+
             for i, plan in enumerate(plans):
-                # Create a dictionary of the plan's attributes
-                plan_dict = {
-                    'id': plan.id,
-                    'name': plan.name,
-                    'age': plan.age,
-                    'gender': plan.gender,
-                    'goal': plan.goal,
-                    'weight': plan.weight,
-                    'height': plan.height,
-                    'activity_level': plan.activity_level,
-                    'training_style': plan.training_style,
-                    'diet_type': plan.diet_type,
-                    'plan': plan.plan,
-                    'created_date': plan.created_date
-                }
-                
-                # Create a detached Plan object with the copied attributes
-                detached_plan = Plan()
-                for key, value in plan_dict.items():
-                    setattr(detached_plan, key, value)
-                
                 # Add week number as an attribute (not in the database schema)
-                week_number = i + 1  # Week 1 is the first plan, Week 2 is the second, etc.
-                setattr(detached_plan, 'week_number', week_number)
-                
-                all_plans.append(detached_plan)
-                
-            return all_plans
+                plan.week_number = i + 1  # Week 1 is the first plan, etc.
+
+            return plans
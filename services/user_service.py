@@ -86,25 +86,38 @@ class UserService:
                     'last_journal_date': None
                 }
                 
-    def update_user_status(self, name: str, **kwargs):
-        """Update user's status fields"""
+    def update_user_status(self, name: str, session=None, **kwargs):
+        """Update user's status fields
+
+        When the caller already holds an open session (e.g. the journal
+        page saving an entry and its status update together), pass it in
+        so both writes commit in one transaction instead of two.
+        """
         try:
             # Check if UserStatus exists in models
             from database.models import UserStatus
+            if session is not None:
+                self._apply_status_update(session, UserStatus, name, kwargs)
+                return
             with db_manager.session_scope() as session:
-                status = session.query(UserStatus).filter_by(name=name).first()
-                if not status:
-                    status = UserStatus(name=name)
-                    session.add(status)
-                
-                # Update fields
-                for key, value in kwargs.items():
-                    if hasattr(status, key):
-                        setattr(status, key, value)
+                self._apply_status_update(session, UserStatus, name, kwargs)
         except ImportError:
             # If UserStatus doesn't exist, we need to add it to the models
             logger.warning("UserStatus model not found. Status updates won't persist.")
-            
+
+    @staticmethod
+    def _apply_status_update(session, UserStatus, name, kwargs):
+        status = session.query(UserStatus).filter_by(name=name).first()
+        if not status:
+            status = UserStatus(name=name)
+            session.add(status)
+
+        # Update fields
+        for key, value in kwargs.items():
+            if hasattr(status, key):
+                setattr(status, key, value)
+
+
     def create_user_data_dict(self, profile: Dict[str, Any]) -> Dict[str, Any]:
         """Create a dictionary of user data for AI service"""
         if not profile:
@@ -0,0 +1,71 @@
+import time
+
+import streamlit as st
+
+from services.user_service import UserService
+
+# How long a cached plan stays fresh before we re-check the database
+_PLAN_TTL_SECONDS = 60
+
+def get_cached_latest_plan(plan_service, username: str):
+    """Return the user's latest plan, cached in session state.
+
+    Pages re-run top to bottom on every widget interaction, so reading
+    the latest plan directly costs a SQL round-trip per rerun even
+    though the plan only changes when one is saved. The cache is keyed
+    by username, expires after a short TTL, and is invalidated
+    explicitly via mark_plan_dirty when a plan or journal entry is
+    saved.
+    """
+    cache = st.session_state.setdefault("plan_cache", {})
+    entry = cache.get(username)
+    dirty = st.session_state.pop(f"{username}_plan_dirty", False)
+    if entry and not dirty and time.time() - entry["ts"] < _PLAN_TTL_SECONDS:
+        return entry["plan"]
+
+    plan = plan_service.get_latest_plan(username)
+    cache[username] = {"plan": plan, "ts": time.time()}
+    return plan
+
+def mark_plan_dirty(username: str) -> None:
+    """Flag the user's cached plan data as stale after a write.
+
+    Also bumps the plans_version counter that versioned st.cache_data
+    helpers (e.g. the history page's plan list) key on.
+    """
+    st.session_state[f"{username}_plan_dirty"] = True
+    st.session_state["plans_version"] = st.session_state.get("plans_version", 0) + 1
+
+@st.cache_resource
+def get_user_service() -> UserService:
+    """Share one stateless UserService instead of one per rerun."""
+    return UserService()
+
+def _user_version() -> int:
+    return st.session_state.get("user_version", 0)
+
+def mark_user_dirty() -> None:
+    """Invalidate cached user status/profile reads after a write."""
+    st.session_state["user_version"] = _user_version() + 1
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_status(username: str, version: int):
+    return get_user_service().get_user_status(username)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_profile(username: str, version: int):
+    return get_user_service().get_user_profile(username)
+
+def get_cached_user_status(username: str):
+    """Get the user's status, cached across reruns.
+
+    Every widget interaction reruns the whole script, and the home,
+    journal and profile pages each read status/profile at the top —
+    redundant DB hits for data that changes only on explicit saves.
+    Writers call mark_user_dirty to version these caches.
+    """
+    return _cached_status(username, _user_version())
+
+def get_cached_user_profile(username: str):
+    """Get the user's profile dict, cached across reruns."""
+    return _cached_profile(username, _user_version())
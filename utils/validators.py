@@ -1,5 +1,12 @@
 import re
 from typing import List, Dict, Any
+from data.allergy_groups import (
+    ALLERGY_GROUPS,
+    ALLERGEN_FOOD_PATTERNS,
+    GENERIC_NUT_TERMS,
+    contains_allergen,
+)
+from data.food_categories import MEAT_PRODUCT_PATTERNS, ANIMAL_PRODUCT_PATTERNS
 
 def validate_plan_content(plan_content: str) -> List[str]:
     """Check for placeholder text and incomplete sections"""
@@ -86,37 +93,19 @@ def validate_meal_plan(plan_content: str, user_data: Dict[str, Any]) -> List[str
     allergies = user_data.get('allergies', '').lower()
     diet_type = user_data.get('diet_type', '').lower()
     
-    # Define common allergens and their related foods
-    allergen_groups = {
-        'nuts': ['peanut', 'almond', 'cashew', 'walnut', 'pecan', 'hazelnut', 'macadamia', 'pistachio', 'pine nut', 
-                'nut butter', 'almond milk', 'almond flour', 'nut oil', 'nutella', 'marzipan', 'nougat'],
-        'peanut': ['peanut', 'peanut butter', 'peanut oil', 'groundnut', 'arachis oil', 'beer nuts', 'mixed nuts'],
-        'tree nuts': ['almond', 'cashew', 'walnut', 'pecan', 'hazelnut', 'macadamia', 'pistachio', 'pine nut', 'brazil nut'],
-        'dairy': ['milk', 'cheese', 'yogurt', 'cream', 'butter', 'whey', 'casein', 'lactose', 'ice cream', 
-                 'dairy', 'buttermilk', 'ghee', 'custard', 'pudding', 'kefir'],
-        'gluten': ['wheat', 'bread', 'pasta', 'flour', 'cereal', 'barley', 'rye', 'oats', 'couscous', 
-                  'beer', 'bulgur', 'durum', 'semolina', 'farina', 'seitan'],
-        'seafood': ['fish', 'shellfish', 'shrimp', 'crab', 'lobster', 'tuna', 'salmon', 'cod', 'prawn', 
-                   'clam', 'mussel', 'oyster', 'scallop', 'squid', 'octopus', 'anchovy', 'sardine'],
-        'eggs': ['egg', 'mayonnaise', 'custard', 'omelette', 'meringue', 'egg white', 'egg yolk', 
-                'quiche', 'frittata', 'hollandaise', 'aioli'],
-        'soy': ['soy', 'tofu', 'edamame', 'soy sauce', 'soy milk', 'tempeh', 'miso', 'natto', 
-               'tamari', 'soybean', 'soy protein'],
-    }
-    
-    # Special case for nuts - add generic terms as well
+    # Special case for nuts - flag generic terms as well (substring match
+    # is deliberate here so "nut mix", "beer nuts" etc. are caught)
     if 'nut' in allergies:
-        generic_nuts = ['nut', 'nuts', 'mixed nuts', 'nut mix', 'trail mix', 'granola']
-        for term in generic_nuts:
+        for term in GENERIC_NUT_TERMS:
             if term in plan_content_lower:
                 violations.append(f"Found generic nuts reference '{term}' for nut allergy")
-    
+
     # Process allergy text to extract relevant allergens
     allergen_keywords = []
-    for allergen in allergen_groups.keys():
+    for allergen in ALLERGY_GROUPS.keys():
         if allergen in allergies:
             allergen_keywords.append(allergen)
-    
+
     # If no specific allergens found but "allergy" words exist, check for common terms
     if not allergen_keywords and allergies:
         # Look for mentions of specific foods
@@ -127,38 +116,33 @@ def validate_meal_plan(plan_content: str, user_data: Dict[str, Any]) -> List[str
                     allergen_keywords.append('peanut')
                     allergen_keywords.append('tree nuts')
                 else:
-                    for allergen, foods in allergen_groups.items():
-                        if food in allergen or food in foods:
+                    for allergen, group in ALLERGY_GROUPS.items():
+                        if food in allergen or food in group['items']:
                             allergen_keywords.append(allergen)
-    
-    # Check for allergens
-    for allergen in allergen_keywords:
-        foods = allergen_groups.get(allergen, [])
-        for food in foods:
-            # Use word boundary check to avoid partial matches (e.g., "nut" in "nutrition")
-            pattern = r'\b' + re.escape(food) + r'\b'
-            matches = re.findall(pattern, plan_content_lower)
-            if matches:
-                for match in matches:
-                    violations.append(f"Found forbidden food '{match}' for {allergen} allergy")
-    
+
+    # Check for allergens. contains_allergen is a single linear pass over
+    # the whole vocabulary, so a clean plan skips the per-food word-boundary
+    # matching entirely; the patterns themselves are compiled at import.
+    if allergen_keywords and contains_allergen(plan_content_lower):
+        for allergen in allergen_keywords:
+            for food, pattern in ALLERGEN_FOOD_PATTERNS.get(allergen, ()):
+                # Word boundaries avoid partial matches (e.g., "nut" in "nutrition")
+                matches = pattern.findall(plan_content_lower)
+                if matches:
+                    for match in matches:
+                        violations.append(f"Found forbidden food '{match}' for {allergen} allergy")
+
     # Check dietary restrictions
     if 'vegetarian' in diet_type:
-        meat_products = ['chicken', 'beef', 'pork', 'turkey', 'lamb', 'veal', 'ham', 'bacon', 'sausage', 
-                         'fish', 'meat', 'steak', 'burger', 'meatball', 'pepperoni', 'salami']
-        for meat in meat_products:
-            pattern = r'\b' + re.escape(meat) + r'\b'
-            if re.search(pattern, plan_content_lower):
+        for meat, pattern in MEAT_PRODUCT_PATTERNS:
+            if pattern.search(plan_content_lower):
                 violations.append(f"Found non-vegetarian food '{meat}' in vegetarian diet")
-    
+
     if 'vegan' in diet_type:
-        animal_products = ['meat', 'fish', 'egg', 'milk', 'cheese', 'yogurt', 'butter', 'honey', 'whey', 
-                          'cream', 'gelatin', 'lard', 'ghee', 'casein', 'lactose', 'poultry', 'beef']
-        for product in animal_products:
-            pattern = r'\b' + re.escape(product) + r'\b'
-            if re.search(pattern, plan_content_lower):
+        for product, pattern in ANIMAL_PRODUCT_PATTERNS:
+            if pattern.search(plan_content_lower):
                 violations.append(f"Found non-vegan food '{product}' in vegan diet")
-    
+
     return violations
 
 def validate_workout_structure(workout_content: str) -> List[str]: